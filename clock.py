@@ -0,0 +1,38 @@
+import time
+
+from exceptions import SimulationFinished
+
+
+class Clock:
+    """Реальные часы процесса."""
+
+    def time(self):
+        """Текущее время в секундах с начала эпохи."""
+        return time.time()
+
+    def sleep(self, seconds):
+        """Останавливает поток на seconds секунд."""
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Виртуальные часы для ускоренной симуляции.
+    sleep() мгновенно переводит время вперёд, а по достижении until
+    выбрасывает SimulationFinished, чтобы остановить бесконечный цикл.
+    """
+
+    def __init__(self, start=0, until=None):
+        self.now = start
+        self.until = until
+
+    def time(self):
+        """Текущее виртуальное время."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Переводит виртуальное время на seconds секунд вперёд."""
+        self.now += seconds
+        if self.until is not None and self.now >= self.until:
+            raise SimulationFinished(
+                f'Симуляция достигла отметки времени {self.until}'
+            )
@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime
+
+from telegram.ext import CommandHandler, Updater
+
+HISTORY_LIMIT = 10
+NO_DATA_MESSAGE = 'Нет свежих данных о ваших работах.'
+
+
+def status_command(update, context):
+    """Отвечает на /status последними статусами работ из кэша."""
+    cache = context.bot_data['status_cache']
+    records = cache.latest(update.effective_chat.id)
+    if not records:
+        update.message.reply_text(NO_DATA_MESSAGE)
+        return
+    lines = [
+        f'"{record.homework_name}": {record.verdict}' for record in records
+    ]
+    update.message.reply_text('Статусы ваших работ:\n' + '\n'.join(lines))
+
+
+def history_command(update, context):
+    """Отвечает на /history последними изменениями статусов из кэша."""
+    cache = context.bot_data['status_cache']
+    records = cache.history(update.effective_chat.id, HISTORY_LIMIT)
+    if not records:
+        update.message.reply_text(NO_DATA_MESSAGE)
+        return
+    lines = [
+        f'{datetime.fromtimestamp(record.updated_at):%d.%m %H:%M} '
+        f'"{record.homework_name}": {record.verdict}'
+        for record in records
+    ]
+    update.message.reply_text('История проверки:\n' + '\n'.join(lines))
+
+
+def start_command_polling(token, status_cache):
+    """Запускает обработку команд бота через long polling.
+    Обработчики отвечают только из status_cache и не обращаются к API.
+    """
+    updater = Updater(token=token, use_context=True)
+    dispatcher = updater.dispatcher
+    dispatcher.bot_data['status_cache'] = status_cache
+    dispatcher.add_handler(CommandHandler('status', status_command))
+    dispatcher.add_handler(CommandHandler('history', history_command))
+    updater.start_polling(timeout=30)
+    logging.info('Запущена обработка команд /status и /history')
+    return updater
+
+
+class CommandPolling:
+    """Обработка команд, которую можно останавливать и запускать снова.
+    Нужна резервным копиям: getUpdates должна опрашивать только одна
+    копия, иначе Telegram отвечает 409 Conflict.
+    """
+
+    def __init__(self, token, status_cache, start=start_command_polling):
+        self.token = token
+        self.status_cache = status_cache
+        self._start = start
+        self._updater = None
+
+    @property
+    def running(self):
+        """Запущена ли обработка команд."""
+        return self._updater is not None
+
+    def start(self):
+        """Запускает обработку команд, если она не запущена."""
+        if self._updater is None:
+            self._updater = self._start(self.token, self.status_cache)
+
+    def stop(self):
+        """Останавливает обработку команд, если она запущена."""
+        if self._updater is not None:
+            # Потоки Updater не фоновые: без stop() процесс не завершится.
+            self._updater.stop()
+            self._updater = None
+            logging.info('Обработка команд остановлена')
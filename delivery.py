@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from telegram.error import BadRequest, RetryAfter, Unauthorized
+
+from metrics import METRICS
+
+VERDICT = 0
+ALERT = 1
+
+
+class _Item:
+    __slots__ = (
+        'priority', 'seq', 'chat_id', 'message', 'repeats', 'dropped',
+        'attempts', 'retry_at', 'context'
+    )
+
+    def __init__(self, priority, seq, chat_id, message, context):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.message = message
+        self.repeats = 1
+        self.dropped = False
+        self.attempts = 0
+        self.retry_at = 0
+        self.context = context
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    @property
+    def key(self):
+        return self.chat_id, self.message
+
+    @property
+    def text(self):
+        if self.repeats > 1:
+            return f'{self.message} (повторов: {self.repeats})'
+        return self.message
+
+
+class OutboundQueue:
+    """Очередь исходящих сообщений с приоритетами.
+    Вердикты по работам отправляются раньше оповещений об ошибках
+    и не отбрасываются из-за нагрузки. Одинаковые оповещения склеиваются,
+    а сверх max_alerts самые старые из них отбрасываются.
+    RetryAfter от Telegram приостанавливает всю очередь, сообщение
+    в недоступный чат (Unauthorized, BadRequest) удаляется, а при прочих
+    ошибках сообщение повторяется с растущей паузой, не задерживая
+    сообщения в другие чаты.
+    """
+
+    def __init__(self, send, max_alerts=10, name='outbound',
+                 clock=time.monotonic, retry_backoff=30, max_backoff=3600):
+        self._send = send
+        self.max_alerts = max_alerts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.name = name
+        self._clock = clock
+        self._heap = []
+        self._alerts = OrderedDict()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._retry_at = 0
+        self._depth = 0
+        self._publish()
+
+    def __len__(self):
+        return self._depth
+
+    def put(self, chat_id, message, priority=VERDICT, context=None):
+        """Ставит сообщение для чата chat_id в очередь.
+        context передаётся в send вместе с сообщением, например ссылка
+        на трассу, в которой сообщение появилось.
+        """
+        with self._lock:
+            key = chat_id, message
+            if priority == ALERT and key in self._alerts:
+                self._alerts[key].repeats += 1
+                METRICS.inc(f'{self.name}_merged')
+                return
+            item = _Item(
+                priority, next(self._seq), chat_id, message, context
+            )
+            heapq.heappush(self._heap, item)
+            self._depth += 1
+            if priority == ALERT:
+                self._alerts[key] = item
+                self._shed()
+            self._publish()
+
+    def flush(self, bot):
+        """Отправляет сообщения в порядке приоритета.
+        Возвращает ключи (chat_id, message) доставленных сообщений.
+        """
+        delivered = []
+        with self._lock:
+            now = self._clock()
+            if now < self._retry_at:
+                return delivered
+            pending = []
+            while self._heap:
+                item = heapq.heappop(self._heap)
+                if item.dropped:
+                    continue
+                if item.retry_at > now:
+                    pending.append(item)
+                    continue
+                try:
+                    self._send(bot, item.chat_id, item.text, item.context)
+                except Exception as error:
+                    if self._failed(item, error, now):
+                        pending.append(item)
+                    if now < self._retry_at:
+                        break
+                    continue
+                delivered.append(item.key)
+                METRICS.inc(f'{self.name}_sent')
+                self._forget(item)
+            for item in pending:
+                heapq.heappush(self._heap, item)
+            self._publish()
+        return delivered
+
+    def clear(self):
+        """Удаляет все сообщения из очереди."""
+        with self._lock:
+            self._heap.clear()
+            self._alerts.clear()
+            self._depth = 0
+            self._publish()
+
+    def _shed(self):
+        while len(self._alerts) > self.max_alerts:
+            _, shed = self._alerts.popitem(last=False)
+            shed.dropped = True
+            self._depth -= 1
+            METRICS.inc(f'{self.name}_shed')
+            logging.warning(
+                f'Оповещение для чата {shed.chat_id} отброшено: '
+                f'{shed.message}'
+            )
+
+    def _forget(self, item):
+        self._depth -= 1
+        if self._alerts.get(item.key) is item:
+            del self._alerts[item.key]
+
+    def _failed(self, item, error, now):
+        """Обрабатывает ошибку отправки; True, если сообщение оставить."""
+        cause = error.__cause__ or error
+        if isinstance(cause, RetryAfter):
+            self._retry_at = now + cause.retry_after
+            METRICS.inc(f'{self.name}_throttled')
+            logging.error(f'Отправка приостановлена: {error}')
+            return True
+        if isinstance(cause, (Unauthorized, BadRequest)):
+            self._forget(item)
+            METRICS.inc(f'{self.name}_undeliverable')
+            logging.error(f'Сообщение удалено из очереди: {error}')
+            return False
+        item.attempts += 1
+        item.retry_at = now + min(
+            self.max_backoff, self.retry_backoff * 2 ** (item.attempts - 1)
+        )
+        METRICS.inc(f'{self.name}_retried')
+        logging.error(f'Отправка будет повторена позже: {error}')
+        return True
+
+    def _publish(self):
+        METRICS.set(f'{self.name}_queue_depth', len(self))
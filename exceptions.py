@@ -1,2 +1,14 @@
 class APIConnectionError(Exception):
     pass
+
+
+class LimiterTimeout(APIConnectionError):
+    pass
+
+
+class InvalidTokenError(APIConnectionError):
+    pass
+
+
+class SimulationFinished(Exception):
+    pass
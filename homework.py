@@ -2,6 +2,9 @@ import logging
 import os
 import sys
 import time
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from http import HTTPStatus
 from logging.handlers import RotatingFileHandler
 
@@ -9,7 +12,19 @@ import requests
 import telegram
 from dotenv import load_dotenv
 
-from exceptions import APIConnectionError
+from clock import Clock
+from commands import CommandPolling
+from delivery import ALERT, OutboundQueue
+from exceptions import APIConnectionError, InvalidTokenError, LimiterTimeout
+from leader import CheckpointBuffer, LeaseElection
+from limiter import AdaptiveLimiter
+from metrics import METRICS, MetricsExporter
+from profiling import Profiler
+from response_cache import fingerprint, record_lookup
+from status_cache import StatusCache
+from tenants import StaticSource, Tenant, TenantRegistry, open_source
+from tracing import Tracer
+from validation import CredentialValidator
 
 load_dotenv()
 
@@ -18,11 +33,40 @@ PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 TOKENS_LIST = ['PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID']
+TENANTS_PATH = os.getenv('TENANTS_PATH')
+REGISTRY_CHECK_INTERVAL = 30
+VALIDATION_WORKERS = 8
+VALIDATION_BATCH = 100
+LEASE_PATH = os.getenv('LEASE_PATH')
 
 RETRY_TIME = 600
+CLOCK = Clock()
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+API_LIMITER = AdaptiveLimiter(
+    'practicum_api',
+    initial_limit=4,
+    max_limit=32,
+    latency_threshold=2.0
+)
+STATUS_CACHE = StatusCache(
+    ttl=3 * RETRY_TIME, clock=lambda: CLOCK.time()
+)
+PROFILER = Profiler(os.path.join(os.path.dirname(__file__), 'profiles'))
+METRICS_INTERVAL = 60
+METRICS_EXPORTER = MetricsExporter(
+    METRICS,
+    os.path.join(os.path.dirname(__file__), 'metrics.jsonl'),
+    interval=METRICS_INTERVAL,
+    clock=lambda: CLOCK.time()
+)
+TRACE_SAMPLE_RATE = 0.1
+TRACER = Tracer(
+    os.path.join(os.path.dirname(__file__), 'traces.jsonl'),
+    sample_rate=TRACE_SAMPLE_RATE
+)
+
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -31,45 +75,102 @@ HOMEWORK_VERDICTS = {
 }
 
 
+def deliver(bot: telegram.Bot, chat_id, message, context=None):
+    """Отправка сообщения в чат chat_id.
+    Участок send записывается в трассу context цикла опроса.
+    """
+    with PROFILER.section('send_message'), TRACER.resume(
+        context, 'send', chat_id=chat_id
+    ):
+        try:
+            bot.send_message(chat_id, message)
+        except Exception as error:
+            raise SystemError(
+                f'Сообщение в чат {chat_id} не отправилось: {error}'
+            ) from error
+        else:
+            logging.info(f'Бот отправил сообщение в чат {chat_id}: {message}')
+
+
 def send_message(bot: telegram.Bot, message):
     """Отправка сообщения в Telegram."""
-    try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-    except Exception as error:
-        raise SystemError(
-            f'Сообщение в чат {TELEGRAM_CHAT_ID} не отправилось: {error}'
-        )
-    else:
-        logging.info(
-            f'Бот отправил сообщение в чат {TELEGRAM_CHAT_ID}: {message}'
-        )
+    deliver(bot, TELEGRAM_CHAT_ID, message)
 
 
-def get_api_answer(current_timestamp):
-    """Делает запрос к эндпоинту API-сервиса."""
+def fetch_statuses(headers, current_timestamp):
+    """Запрос статусов работ с заголовками headers.
+    Возвращает ответ без разбора JSON.
+    """
     params = {'from_date': current_timestamp}
+    # Заголовки с токеном не попадают ни в лог, ни в текст ошибки:
+    # он уходит в Telegram и в трассы.
     request_params = {
         'url': ENDPOINT,
-        'headers': HEADERS,
         'params': params
     }
     logging.info(
         f'Отправка запроса к эндпоинту с параметрами: {request_params}'
     )
-    try:
-        response = requests.get(**request_params)
-    except Exception as error:
-        raise ConnectionError(
-            f'Ошибка при отправке запроса к API: {error}, '
-            f'с параметрами: {request_params}'
-        )
-
-    if response.status_code != HTTPStatus.OK:
-        raise APIConnectionError(
+    with API_LIMITER.slot():
+        try:
+            response = requests.get(
+                **request_params, headers=headers,
+                timeout=API_LIMITER.request_timeout
+            )
+        except Exception as error:
+            raise ConnectionError(
+                f'Ошибка при отправке запроса к API: {error}, '
+                f'с параметрами: {request_params}'
+            )
+        error = APIConnectionError(
             'Не удалось подключиться к API '
             f'код ответа: {response.status_code}'
         )
-    return response.json()
+        # Снижать лимит для всех подписчиков должна только перегрузка
+        # API, а не, например, недействительный токен одного из них.
+        if (
+            response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+            or response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        ):
+            raise error
+    if response.status_code in (HTTPStatus.UNAUTHORIZED,
+                                HTTPStatus.FORBIDDEN):
+        raise InvalidTokenError(error)
+    if response.status_code != HTTPStatus.OK:
+        raise error
+    return response
+
+
+def request_statuses(headers, current_timestamp):
+    """Запрос статусов работ с заголовками headers."""
+    return fetch_statuses(headers, current_timestamp).json()
+
+
+def get_api_answer(current_timestamp):
+    """Делает запрос к эндпоинту API-сервиса."""
+    return request_statuses(HEADERS, current_timestamp)
+
+
+def probe_tenant(bot: telegram.Bot, tenant):
+    """Проверяет токен Практикума и доступность чата подписчика.
+    Возвращает пару (valid, reason), при временных сбоях выбрасывает
+    исключение.
+    """
+    with API_LIMITER.slot():
+        response = requests.get(
+            ENDPOINT,
+            headers={'Authorization': f'OAuth {tenant.practicum_token}'},
+            params={'from_date': int(CLOCK.time())},
+            timeout=API_LIMITER.request_timeout
+        )
+    if response.status_code in (HTTPStatus.UNAUTHORIZED,
+                                HTTPStatus.FORBIDDEN):
+        return False, 'недействительный токен Практикума'
+    try:
+        bot.get_chat(tenant.chat_id)
+    except (telegram.error.Unauthorized, telegram.error.BadRequest) as error:
+        return False, f'чат недоступен: {error}'
+    return True, ''
 
 
 def check_response(response):
@@ -113,18 +214,229 @@ def parse_status(homework):
     return f'Изменился статус проверки работы "{homework_name}". {verdict}'
 
 
+OUTBOX = OutboundQueue(
+    deliver, max_alerts=1000, clock=lambda: CLOCK.time()
+)
+
+
+def homework_updated_at(homework):
+    """Время последнего изменения работы из поля date_updated или None."""
+    try:
+        return timegm(time.strptime(
+            homework['date_updated'], '%Y-%m-%dT%H:%M:%SZ'
+        ))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def remember_statuses(chat_id, homeworks):
+    """Сохраняет статусы работ в кэш для команд бота."""
+    STATUS_CACHE.touch(chat_id)
+    for homework in reversed(homeworks):
+        status = homework.get('status')
+        if 'homework_name' in homework and status in HOMEWORK_VERDICTS:
+            STATUS_CACHE.record(
+                chat_id,
+                homework['homework_name'],
+                status,
+                HOMEWORK_VERDICTS[status],
+                homework_updated_at(homework)
+            )
+
+
+def seed_statuses(state):
+    """Заполняет кэш статусов полной историей работ подписчика.
+    Нужен, чтобы /status отвечал и о работах, не менявшихся с запуска
+    бота, и повторяется, если данные чата истекли или вытеснены из кэша.
+    Уведомления при этом не отправляются.
+    """
+    tenant = state.tenant
+    try:
+        with TRACER.span('seed'):
+            response = request_statuses(
+                {'Authorization': f'OAuth {tenant.practicum_token}'}, 0
+            )
+            remember_statuses(tenant.chat_id, check_response(response))
+    except Exception as error:
+        logging.warning(
+            f'Не удалось загрузить историю работ чата {tenant.chat_id}: '
+            f'{error}'
+        )
+        return
+    state.seeded = True
+
+
 def check_tokens():
     """Проверяем доступность переменных окружения.
     Если отсутсвует хотя бы одна переменная должно возвращаться False.
+    При заданном TENANTS_PATH токен Практикума и чат берутся из реестра.
     """
     tokens = True
-    for token in TOKENS_LIST:
+    for token in ['TELEGRAM_TOKEN'] if TENANTS_PATH else TOKENS_LIST:
         if not globals().get(token):
             tokens = False
             logging.info(f'Отсутвует токен: {token}')
     return tokens
 
 
+def poll_cycle(state):
+    """Один цикл опроса API для подписчика.
+    Сообщения ставятся в очередь OUTBOX, state обновляется на месте.
+    Ответ, совпавший с последним ответом без изменений, не разбирается.
+    Если API отверг токен, причина записывается в state.rejected.
+    """
+    tenant = state.tenant
+    try:
+        with TRACER.span('fetch'):
+            raw_response = fetch_statuses(
+                {'Authorization': f'OAuth {tenant.practicum_token}'},
+                state.current_timestamp
+            )
+        digest = fingerprint(raw_response.content)
+        record_lookup(hit=digest == state.fingerprint)
+        if digest == state.fingerprint:
+            logging.debug('Ответ API не изменился')
+            STATUS_CACHE.touch(tenant.chat_id)
+            TRACER.tag(cache='hit')
+            return
+        response = raw_response.json()
+        with TRACER.span('validate'):
+            homeworks = check_response(response)
+        with TRACER.span('diff', homeworks=len(homeworks)):
+            remember_statuses(tenant.chat_id, homeworks)
+        if not homeworks:
+            logging.debug('Статус работы не изменился')
+            state.fingerprint = digest
+            return
+        with TRACER.span('render'):
+            msg = parse_status(homeworks[0])
+        if state.last_msg != msg:
+            OUTBOX.put(tenant.chat_id, msg, context=TRACER.context())
+            state.last_msg = msg
+            TRACER.tag(outcome='queued')
+        state.current_timestamp = response.get(
+            'current_date', state.current_timestamp
+        )
+    except LimiterTimeout as error:
+        # Перегрузка самого бота: опрос переносится на следующий цикл,
+        # студенту об этом не сообщается.
+        logging.warning(f'Опрос чата {tenant.chat_id} пропущен: {error}')
+        METRICS.inc('poll_skipped')
+        STATUS_CACHE.touch(tenant.chat_id, create=False)
+        TRACER.tag(outcome='skipped', error=str(error))
+    except Exception as error:
+        message = f'Сбой в работе программы: {error}'
+        logging.error(message)
+        # Сбой опроса не делает устаревшими уже известные статусы.
+        STATUS_CACHE.touch(tenant.chat_id, create=False)
+        TRACER.tag(outcome='error', error=str(error))
+        if isinstance(error, InvalidTokenError):
+            state.rejected = 'недействительный токен Практикума'
+        if state.last_msg != message:
+            OUTBOX.put(
+                tenant.chat_id, message, ALERT, context=TRACER.context()
+            )
+            state.last_msg = message
+
+
+def poll_tenant(state):
+    """Цикл опроса подписчика под профилировщиком и трассировкой."""
+    with PROFILER.section('poll_cycle'), TRACER.trace(
+        'poll_cycle', chat_id=state.tenant.chat_id, outcome='unchanged'
+    ):
+        if not state.seeded or state.tenant.chat_id not in STATUS_CACHE:
+            seed_statuses(state)
+        poll_cycle(state)
+
+
+def load_registry():
+    """Реестр подписчиков из TENANTS_PATH или из переменных окружения."""
+    if TENANTS_PATH:
+        source = open_source(TENANTS_PATH)
+    else:
+        source = StaticSource([Tenant(TELEGRAM_CHAT_ID, PRACTICUM_TOKEN)])
+    return TenantRegistry(
+        source, check_interval=REGISTRY_CHECK_INTERVAL, spread=RETRY_TIME
+    )
+
+
+def await_leadership(election, registry):
+    """Ждёт аренды и восстанавливает состояние прежней ведущей копии.
+    Неотправленные сообщения сбрасываются: их заново сформирует опрос
+    от последней сохранённой контрольной точки.
+    """
+    OUTBOX.clear()
+    if not election.is_leader:
+        logging.info('Копия работает в резервном режиме')
+    while not election.is_leader:
+        CLOCK.sleep(election.renew_interval)
+    registry.refresh(CLOCK.time())
+    for chat_id, checkpoint in election.load_checkpoints().items():
+        state = registry.get(chat_id)
+        if state is not None:
+            state.current_timestamp, state.last_msg = checkpoint
+
+
+def poll_due(pool, validator, due):
+    """Опрашивает подписчиков due, кроме находящихся на карантине.
+    Подписчики, чей токен API отверг при опросе, отправляются на карантин.
+    """
+    validator.validate(state.tenant for state in due)
+    list(pool.map(poll_tenant, [
+        state for state in due
+        if validator.is_valid(state.tenant) is not False
+    ]))
+    for state in due:
+        if state.rejected:
+            validator.invalidate(state.tenant, state.rejected)
+            state.rejected = ''
+
+
+def run_polling(bot, registry, election=None, commands=None):
+    """Бесконечный цикл опроса подписчиков реестра по часам CLOCK.
+    Каждый подписчик опрашивается раз в RETRY_TIME, изменения реестра
+    подхватываются без перезапуска. Подписчики с недействительными
+    учётными данными пропускаются до повторной проверки. При заданном
+    election опрашивает, отправляет сообщения и обрабатывает команды
+    commands только ведущая копия.
+    """
+    validator = CredentialValidator(
+        partial(probe_tenant, bot), max_workers=VALIDATION_WORKERS,
+        clock=CLOCK.time, batch_size=VALIDATION_BATCH
+    )
+    checkpoints = CheckpointBuffer(election)
+    leading = False
+    with ThreadPoolExecutor(max_workers=API_LIMITER.max_limit) as pool:
+        while True:
+            if election is not None and not (leading and election.is_leader):
+                if commands is not None:
+                    commands.stop()
+                await_leadership(election, registry)
+                checkpoints.clear()
+                if commands is not None:
+                    commands.start()
+                leading = True
+            now = CLOCK.time()
+            registry.refresh(now)
+            due = registry.due(now)
+            before = [(state.current_timestamp, state.last_msg)
+                      for state in due]
+            poll_due(pool, validator, due)
+            for state in due:
+                registry.schedule(state, now + RETRY_TIME)
+            if election is not None and not election.is_leader:
+                continue
+            with TRACER.trace('deliver', queued=len(OUTBOX)):
+                delivered = OUTBOX.flush(bot)
+            if election is not None:
+                for state, checkpoint in zip(due, before):
+                    checkpoints.polled(state, checkpoint)
+                checkpoints.delivered(delivered, len(OUTBOX))
+                checkpoints.save()
+            METRICS_EXPORTER.maybe_export()
+            CLOCK.sleep(registry.sleep_time(CLOCK.time()))
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
@@ -133,31 +445,19 @@ def main():
         raise SystemExit(error_msg)
 
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    last_msg = ''
-
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if not homeworks:
-                logging.debug('Статус работы не изменился')
-                continue
-            msg = parse_status(homeworks[0])
-            if last_msg != msg:
-                send_message(bot, msg)
-                last_msg = msg
-            current_timestamp = response.get(
-                'current_date', current_timestamp
-            )
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            if last_msg != message:
-                send_message(bot, message)
-                last_msg = message
-        finally:
-            time.sleep(RETRY_TIME)
+    PROFILER.install_signal_handlers()
+    election = LeaseElection(LEASE_PATH) if LEASE_PATH else None
+    commands = CommandPolling(TELEGRAM_TOKEN, STATUS_CACHE)
+    try:
+        if election is None:
+            commands.start()
+        else:
+            election.start()
+        run_polling(bot, load_registry(), election, commands)
+    finally:
+        commands.stop()
+        if election is not None:
+            election.release()
 
 
 if __name__ == '__main__':
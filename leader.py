@@ -0,0 +1,190 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class LeaseElection:
+    """Выбор ведущей копии бота через аренду в общей базе SQLite.
+    Ведущей считается копия, владеющая неистёкшей арендой name.
+    Аренда продлевается фоновым потоком каждые renew_interval секунд
+    и истекает через ttl секунд, после чего её забирает резервная копия.
+    В той же базе ведущая копия сохраняет контрольные точки опроса
+    подписчиков, чтобы новая ведущая не повторяла отправленные сообщения.
+    """
+
+    def __init__(self, path, name='homework_bot', ttl=10, renew_interval=3,
+                 holder=None, clock=time.time):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = holder or (
+            f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        )
+        self._clock = clock
+        self._expires_at = 0
+        self._stop = threading.Event()
+        self._renewer = None
+        self._connection = sqlite3.connect(
+            path, timeout=renew_interval, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'name TEXT PRIMARY KEY, '
+                'holder TEXT NOT NULL, '
+                'expires_at REAL NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoints ('
+                'name TEXT NOT NULL, '
+                'chat_id TEXT NOT NULL, '
+                'from_date INTEGER NOT NULL, '
+                'last_msg TEXT NOT NULL, '
+                'PRIMARY KEY (name, chat_id))'
+            )
+
+    @property
+    def is_leader(self):
+        """Владеет ли эта копия неистёкшей арендой."""
+        return self._expires_at > self._clock()
+
+    def try_acquire(self):
+        """Захватывает свободную или продлевает свою аренду."""
+        now = self._clock()
+        was_leader = self.is_leader
+        try:
+            with self._lock, self._connection:
+                acquired = self._connection.execute(
+                    'INSERT INTO leases (name, holder, expires_at) '
+                    'VALUES (?, ?, ?) '
+                    'ON CONFLICT (name) DO UPDATE SET '
+                    'holder = excluded.holder, '
+                    'expires_at = excluded.expires_at '
+                    'WHERE leases.holder = excluded.holder '
+                    'OR leases.expires_at <= ?',
+                    (self.name, self.holder, now + self.ttl, now)
+                ).rowcount == 1
+        except sqlite3.Error as error:
+            logging.error(f'Не удалось продлить аренду {self.name}: {error}')
+            return self.is_leader
+        if acquired:
+            self._expires_at = now + self.ttl
+        if acquired and not was_leader:
+            logging.info(f'Копия {self.holder} стала ведущей')
+        elif was_leader and not self.is_leader:
+            logging.warning(f'Копия {self.holder} потеряла аренду')
+        return self.is_leader
+
+    def release(self):
+        """Освобождает аренду, чтобы резервная копия не ждала ttl."""
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+        self._expires_at = 0
+        with self._lock, self._connection:
+            self._connection.execute(
+                'DELETE FROM leases WHERE name = ? AND holder = ?',
+                (self.name, self.holder)
+            )
+
+    def start(self):
+        """Запускает фоновое продление аренды."""
+        self.try_acquire()
+        self._renewer = threading.Thread(
+            target=self._renew_loop, name='lease', daemon=True
+        )
+        self._renewer.start()
+
+    def save_checkpoints(self, states):
+        """Сохраняет метку времени и последнее сообщение подписчиков.
+        Возвращает False, если база недоступна.
+        """
+        try:
+            with self._lock, self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO checkpoints '
+                    '(name, chat_id, from_date, last_msg) '
+                    'VALUES (?, ?, ?, ?)',
+                    [
+                        (self.name, state.tenant.chat_id,
+                         state.current_timestamp, state.last_msg)
+                        for state in states
+                    ]
+                )
+        except sqlite3.Error as error:
+            logging.error(
+                f'Не удалось сохранить контрольные точки {self.name}: {error}'
+            )
+            return False
+        return True
+
+    def load_checkpoints(self):
+        """Контрольные точки подписчиков: chat_id -> (timestamp, msg)."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT chat_id, from_date, last_msg '
+                'FROM checkpoints WHERE name = ?',
+                (self.name,)
+            ).fetchall()
+        return {chat_id: (timestamp, msg) for chat_id, timestamp, msg in rows}
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.renew_interval):
+            self.try_acquire()
+
+
+class CheckpointBuffer:
+    """Контрольные точки подписчиков, ещё не записанные в базу.
+    Точка с новым сообщением записывается только после его доставки,
+    иначе новая ведущая копия сочла бы его отправленным. Точки,
+    не записанные из-за ошибки базы, записываются при следующем save().
+    """
+
+    def __init__(self, election):
+        self._election = election
+        self._unsent = {}
+        self._unsaved = {}
+
+    def polled(self, state, checkpoint):
+        """Учитывает опрос state, до которого было checkpoint."""
+        chat_id = state.tenant.chat_id
+        timestamp, last_msg = checkpoint
+        if state.last_msg != last_msg:
+            self._unsaved.pop(chat_id, None)
+            self._unsent[chat_id] = state
+        elif (
+            state.current_timestamp != timestamp
+            and chat_id not in self._unsent
+        ):
+            self._unsaved[chat_id] = state
+
+    def delivered(self, keys, queued):
+        """Учитывает доставленные сообщения (chat_id, message).
+        При пустой очереди queued недоставленные сообщения уже отброшены
+        и больше не задерживают точки своих подписчиков.
+        """
+        for chat_id, message in keys:
+            state = self._unsent.get(chat_id)
+            if state is not None and state.last_msg == message:
+                del self._unsent[chat_id]
+                self._unsaved[chat_id] = state
+        if not queued:
+            self._unsent.clear()
+
+    def save(self):
+        """Записывает накопленные точки."""
+        if self._unsaved and self._election.save_checkpoints(
+            list(self._unsaved.values())
+        ):
+            self._unsaved.clear()
+
+    def clear(self):
+        """Забывает все точки, например после смены ведущей копии."""
+        self._unsent.clear()
+        self._unsaved.clear()
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from exceptions import APIConnectionError, LimiterTimeout
+from metrics import METRICS
+
+
+class AdaptiveLimiter:
+    """Ограничивает число одновременных запросов к API по схеме AIMD.
+    Успешный быстрый ответ плавно увеличивает лимит, ошибка соединения
+    или медленный ответ уменьшают его в backoff_ratio раз.
+    Запросы должны выполняться с таймаутом request_timeout, чтобы
+    зависший запрос не занимал слот бесконечно и считался ошибкой.
+    Перегрузкой считаются только OSError (ошибки сети и таймауты)
+    и APIConnectionError: ответы, говорящие о проблеме конкретного
+    запроса, должны выбрасываться уже после выхода из slot().
+    """
+
+    def __init__(self, name, initial_limit=4, min_limit=1, max_limit=32,
+                 latency_threshold=2.0, backoff_ratio=0.5,
+                 request_timeout=None, acquire_timeout=60):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.request_timeout = request_timeout or 5 * latency_threshold
+        self.acquire_timeout = acquire_timeout
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._last_decrease = float('-inf')
+        self._cond = threading.Condition()
+        self._publish()
+
+    @property
+    def limit(self):
+        """Текущее число разрешённых одновременных запросов."""
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self):
+        """Число запросов, выполняющихся в данный момент."""
+        return self._in_flight
+
+    def acquire(self, timeout=None):
+        """Занимает слот. Возвращает False, если не дождались timeout."""
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._in_flight < self.limit, timeout
+            ):
+                return False
+            self._in_flight += 1
+            self._publish()
+            return True
+
+    def release(self, started, latency, failed=False):
+        """Освобождает слот и пересчитывает лимит по итогам запроса."""
+        with self._cond:
+            self._in_flight -= 1
+            if failed or latency > self.latency_threshold:
+                # Запросы, начатые до последнего снижения, уже учтены им.
+                if started > self._last_decrease:
+                    self._decrease(latency, failed)
+            else:
+                self._limit = min(
+                    self.max_limit, self._limit + 1 / self._limit
+                )
+            self._publish()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Контекст выполнения одного запроса под лимитом.
+        Слот ожидается не дольше timeout, по умолчанию acquire_timeout,
+        иначе выбрасывается LimiterTimeout.
+        """
+        if timeout is None:
+            timeout = self.acquire_timeout
+        if not self.acquire(timeout):
+            raise LimiterTimeout(
+                f'Превышен лимит одновременных запросов {self.name}: '
+                f'{self.limit}'
+            )
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except (OSError, APIConnectionError):
+            failed = True
+            raise
+        finally:
+            self.release(started, time.monotonic() - started, failed)
+
+    def _decrease(self, latency, failed):
+        old_limit = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        self._last_decrease = time.monotonic()
+        if self.limit == old_limit:
+            return
+        reason = 'ошибка запроса' if failed else f'задержка {latency:.2f} с'
+        logging.warning(
+            f'Лимит запросов {self.name} снижен с {old_limit} '
+            f'до {self.limit}: {reason}'
+        )
+
+    def _publish(self):
+        METRICS.set(f'{self.name}_concurrency_limit', self.limit)
+        METRICS.set(f'{self.name}_in_flight', self._in_flight)
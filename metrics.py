@@ -0,0 +1,82 @@
+import json
+import logging
+import threading
+import time
+
+
+class Metrics:
+    """Потокобезопасный реестр счётчиков и текущих значений бота."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, value=1):
+        """Увеличивает счётчик name на value."""
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + value
+
+    def set(self, name, value):
+        """Записывает текущее значение метрики name."""
+        with self._lock:
+            self._values[name] = value
+
+    def record_hit(self, name, hit):
+        """Учитывает попадание или промах name и долю попаданий.
+        Счётчики и доля name_hit_rate меняются вместе под одной блокировкой.
+        """
+        with self._lock:
+            key = f'{name}_hits' if hit else f'{name}_misses'
+            self._values[key] = self._values.get(key, 0) + 1
+            hits = self._values.get(f'{name}_hits', 0)
+            total = hits + self._values.get(f'{name}_misses', 0)
+            self._values[f'{name}_hit_rate'] = hits / total
+
+    def get(self, name, default=0):
+        """Возвращает значение метрики name."""
+        with self._lock:
+            return self._values.get(name, default)
+
+    def snapshot(self):
+        """Возвращает копию всех метрик."""
+        with self._lock:
+            return dict(self._values)
+
+
+class MetricsExporter:
+    """Раз в interval секунд выгружает снимок метрик в лог.
+    При заданном path снимок ещё и дописывается в файл JSON lines
+    в виде {"time": ..., "metrics": {...}}.
+    """
+
+    def __init__(self, metrics, path=None, interval=60, clock=time.time):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._clock = clock
+        self._next_export = float('-inf')
+
+    def maybe_export(self):
+        """Выгружает снимок, если с прошлой выгрузки прошло interval."""
+        now = self._clock()
+        if now < self._next_export:
+            return False
+        self._next_export = now + self.interval
+        self.export(now)
+        return True
+
+    def export(self, now=None):
+        """Выгружает текущий снимок метрик."""
+        snapshot = self.metrics.snapshot()
+        report = json.dumps(snapshot, ensure_ascii=False, sort_keys=True)
+        logging.info(f'Метрики: {report}')
+        if self.path is not None:
+            record = {
+                'time': self._clock() if now is None else now,
+                'metrics': snapshot,
+            }
+            with open(self.path, 'a', encoding='utf-8') as output:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+METRICS = Metrics()
@@ -0,0 +1,179 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Profiler:
+    """Профилирование работающего бота без перезапуска.
+    CPU профилируется выборками стека потоков, находящихся внутри
+    section(); память — снимками tracemalloc. Оба режима
+    включаются и выключаются сигналами, результаты пишутся в output_dir.
+    """
+
+    def __init__(self, output_dir, interval=0.01, top=30):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top = top
+        self._sections = {}
+        self._sampler = None
+        self._stop = threading.Event()
+        self._started_at = 0
+        self._samples = Counter()
+        self._own = Counter()
+        self._total = Counter()
+        self._last_snapshot = None
+
+    @property
+    def cpu_enabled(self):
+        """Идёт ли сейчас профилирование CPU."""
+        return self._sampler is not None
+
+    @property
+    def memory_enabled(self):
+        """Идёт ли сейчас трассировка памяти."""
+        return tracemalloc.is_tracing()
+
+    @contextmanager
+    def section(self, name):
+        """Отмечает участок кода, выборки в котором попадут в отчёт."""
+        stack = self._sections.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def start_cpu(self):
+        """Запускает поток, снимающий выборки стека."""
+        if self.cpu_enabled:
+            return
+        self._samples.clear()
+        self._own.clear()
+        self._total.clear()
+        self._stop.clear()
+        self._started_at = time.time()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name='profiler', daemon=True
+        )
+        self._sampler.start()
+        logging.info('Профилирование CPU включено')
+
+    def stop_cpu(self):
+        """Останавливает профилирование CPU и пишет отчёт в файл."""
+        if not self.cpu_enabled:
+            return None
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        path = self._dump_path('cpu')
+        with open(path, 'w', encoding='utf-8') as report:
+            report.write(self.format_cpu_report())
+        logging.info(f'Профилирование CPU выключено, отчёт: {path}')
+        return path
+
+    def start_memory(self):
+        """Включает трассировку выделения памяти."""
+        if not self.memory_enabled:
+            tracemalloc.start()
+            logging.info('Трассировка памяти включена')
+
+    def stop_memory(self):
+        """Снимает снимок памяти, пишет отчёт и выключает трассировку.
+        В отчёт также попадает разница с предыдущим снимком.
+        """
+        if not self.memory_enabled:
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        tracemalloc.stop()
+        path = self._dump_path('memory')
+        with open(path, 'w', encoding='utf-8') as report:
+            report.write('Крупнейшие выделения памяти:\n')
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                report.write(f'{stat}\n')
+            if self._last_snapshot is not None:
+                report.write('\nИзменения с прошлого снимка:\n')
+                diff = snapshot.compare_to(self._last_snapshot, 'lineno')
+                for stat in diff[:self.top]:
+                    report.write(f'{stat}\n')
+        self._last_snapshot = snapshot
+        logging.info(f'Трассировка памяти выключена, отчёт: {path}')
+        return path
+
+    def toggle_cpu(self, *args):
+        """Переключает профилирование CPU, подходит как обработчик сигнала."""
+        if self.cpu_enabled:
+            self.stop_cpu()
+        else:
+            self.start_cpu()
+
+    def toggle_memory(self, *args):
+        """Переключает трассировку памяти, подходит как обработчик сигнала."""
+        if self.memory_enabled:
+            self.stop_memory()
+        else:
+            self.start_memory()
+
+    def install_signal_handlers(self):
+        """SIGUSR1 переключает профилирование CPU, SIGUSR2 — памяти."""
+        if not hasattr(signal, 'SIGUSR1'):
+            logging.warning('Сигналы профилирования не поддерживаются')
+            return
+        signal.signal(signal.SIGUSR1, self.toggle_cpu)
+        signal.signal(signal.SIGUSR2, self.toggle_memory)
+
+    def format_cpu_report(self):
+        """Отчёт по функциям: доля собственных и общих выборок."""
+        lines = [
+            f'Профиль CPU с {time.ctime(self._started_at)}, '
+            f'интервал выборки {self.interval} с'
+        ]
+        for label, samples in self._samples.most_common():
+            lines.append(f'\nСекция {label}: {samples} выборок')
+            lines.append(f'{"own%":>7} {"total%":>7}  функция')
+            functions = [
+                key for key, _ in self._total.most_common()
+                if key[0] == label
+            ]
+            for key in functions[:self.top]:
+                _, filename, lineno, name = key
+                lines.append(
+                    f'{100 * self._own[key] / samples:7.1f} '
+                    f'{100 * self._total[key] / samples:7.1f}  '
+                    f'{name} ({filename}:{lineno})'
+                )
+        return '\n'.join(lines) + '\n'
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, stack in list(self._sections.items()):
+                if stack and ident in frames:
+                    self._record('/'.join(stack), frames[ident])
+
+    def _record(self, label, frame):
+        self._samples[label] += 1
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            key = (label, code.co_filename, code.co_firstlineno, code.co_name)
+            if not seen:
+                self._own[key] += 1
+            if key not in seen:
+                self._total[key] += 1
+                seen.add(key)
+            frame = frame.f_back
+
+    def _dump_path(self, kind):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(
+            self.output_dir,
+            f'{kind}-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.txt'
+        )
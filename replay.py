@@ -0,0 +1,176 @@
+"""Запись ответов API Практикума и их воспроизведение на виртуальных часах.
+
+Запись во время реальной работы бота:
+    python replay.py record responses.jsonl
+
+Прогон записанных ответов через цикл опроса без реальных пауз:
+    python replay.py replay responses.jsonl
+"""
+import bisect
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import requests
+
+import homework
+from clock import VirtualClock
+from exceptions import SimulationFinished
+from metrics import METRICS, MetricsExporter
+from tenants import StaticSource, Tenant, TenantRegistry
+from tracing import Tracer
+
+
+class ReplayResponse:
+    """Ответ API, восстановленный из записи."""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+
+    def json(self):
+        """Тело ответа, разобранное из JSON."""
+        return json.loads(self.text)
+
+
+class Recorder:
+    """Дописывает каждый ответ API в файл JSON lines.
+    Заголовки с токенами не сохраняются.
+    """
+
+    def __init__(self, path, get=requests.get, clock=None):
+        self.path = path
+        self._get = get
+        self._clock = clock or homework.CLOCK
+
+    def get(self, url, params=None, **kwargs):
+        """Выполняет запрос и записывает ответ."""
+        response = self._get(url, params=params, **kwargs)
+        record = {
+            'at': self._clock.time(),
+            'params': params,
+            'status_code': response.status_code,
+            'text': response.text,
+        }
+        with open(self.path, 'a', encoding='utf-8') as output:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return response
+
+
+class Replayer:
+    """Отдаёт записанные ответы по виртуальному времени.
+    На запрос возвращается последний ответ, записанный не позже
+    текущего момента часов clock, поэтому сутки записи воспроизводятся
+    одинаково при любом интервале опроса.
+    """
+
+    def __init__(self, records, clock):
+        self.records = sorted(records, key=lambda record: record['at'])
+        self._times = [record['at'] for record in self.records]
+        self._clock = clock
+        self.requests = 0
+
+    @property
+    def start(self):
+        """Время первой записи."""
+        return self._times[0]
+
+    @property
+    def end(self):
+        """Время последней записи."""
+        return self._times[-1]
+
+    def get(self, url, params=None, **kwargs):
+        """Подменяет requests.get ответом из записи."""
+        self.requests += 1
+        index = bisect.bisect_right(self._times, self._clock.time()) - 1
+        record = self.records[max(index, 0)]
+        return ReplayResponse(record['status_code'], record['text'])
+
+
+class SimulatedBot:
+    """Бот, который только запоминает отправленные сообщения."""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self.sent = []
+
+    def get_chat(self, chat_id, **kwargs):
+        """Любой чат считается доступным."""
+        return chat_id
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Сохраняет сообщение вместо отправки в Telegram."""
+        self.sent.append((self._clock.time(), chat_id, text))
+
+
+def load_records(path):
+    """Загружает записи ответов из файла JSON lines."""
+    with open(path, encoding='utf-8') as records:
+        return [json.loads(line) for line in records if line.strip()]
+
+
+@contextmanager
+def recording(path):
+    """Подменяет requests.get записывающей обёрткой."""
+    recorder = Recorder(path)
+    with mock.patch.object(requests, 'get', recorder.get):
+        yield recorder
+
+
+def simulate(records, tenants=1, until=None, tracer=None):
+    """Прогоняет записанные ответы через homework.run_polling.
+    Все tenants подписчиков получают одни и те же ответы.
+    Без tracer трассировка на время симуляции отключается, метрики
+    выгружаются только в лог.
+    Возвращает бота с отправленными сообщениями и объект воспроизведения.
+    """
+    tracer = tracer or Tracer(homework.TRACER.path, sample_rate=0)
+    clock = VirtualClock()
+    replayer = Replayer(records, clock)
+    clock.now = replayer.start
+    clock.until = until or replayer.end + homework.RETRY_TIME
+    bot = SimulatedBot(clock)
+    registry = TenantRegistry(StaticSource(
+        Tenant(str(chat_id), 'simulated') for chat_id in range(tenants)
+    ))
+    exporter = MetricsExporter(
+        METRICS, interval=homework.METRICS_INTERVAL, clock=clock.time
+    )
+    with mock.patch.object(homework, 'CLOCK', clock), \
+            mock.patch.object(homework, 'TRACER', tracer), \
+            mock.patch.object(homework, 'METRICS_EXPORTER', exporter), \
+            mock.patch.object(requests, 'get', replayer.get):
+        try:
+            homework.run_polling(bot, registry)
+        except SimulationFinished:
+            pass
+    return bot, replayer
+
+
+def main(argv):
+    """Точка входа командной строки."""
+    if len(argv) != 3 or argv[1] not in ('record', 'replay'):
+        raise SystemExit(__doc__)
+    command, path = argv[1:]
+    if command == 'record':
+        with recording(path):
+            homework.main()
+        return
+    started = time.monotonic()
+    bot, replayer = simulate(load_records(path))
+    logging.info(
+        f'Воспроизведено {replayer.requests} запросов за '
+        f'{replayer.end - replayer.start:.0f} с виртуального времени '
+        f'за {time.monotonic() - started:.2f} с, '
+        f'отправлено сообщений: {len(bot.sent)}'
+    )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main(sys.argv)
@@ -0,0 +1,26 @@
+import hashlib
+import re
+
+from metrics import METRICS
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*\d+')
+
+
+def fingerprint(content):
+    """Хэш тела ответа API без значения current_date.
+    current_date меняется при каждом запросе, поэтому без него
+    одинаковые по сути ответы получают одинаковый хэш.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    match = CURRENT_DATE.search(content)
+    if match is None:
+        digest.update(content)
+    else:
+        digest.update(content[:match.start()])
+        digest.update(content[match.end():])
+    return digest.digest()
+
+
+def record_lookup(hit):
+    """Учитывает обращение к кэшу ответов в метриках."""
+    METRICS.record_hit('response_cache', hit)
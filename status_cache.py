@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+StatusRecord = namedtuple(
+    'StatusRecord', ['homework_name', 'status', 'verdict', 'updated_at']
+)
+
+
+class _ChatEntry:
+    __slots__ = ('latest', 'history', 'expires_at')
+
+    def __init__(self):
+        self.latest = {}
+        self.history = []
+        self.expires_at = 0
+
+
+class StatusCache:
+    """Кэш последних статусов домашних работ по чатам.
+    Заполняется циклом опроса API, команды бота только читают из него.
+    Чат вытесняется, если не обновлялся дольше ttl секунд или если
+    чатов стало больше max_chats (дольше всех не использованный).
+    """
+
+    def __init__(self, max_chats=10000, ttl=3600, history_size=20,
+                 clock=time.time):
+        self.max_chats = max_chats
+        self.ttl = ttl
+        self.history_size = history_size
+        self._clock = clock
+        self._chats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, chat_id, homework_name, status, verdict,
+               updated_at=None):
+        """Сохраняет статус работы, если он изменился.
+        Без updated_at временем изменения считается текущее время clock.
+        """
+        with self._lock:
+            entry = self._entry(str(chat_id), create=True)
+            previous = entry.latest.get(homework_name)
+            if previous is None or previous.status != status:
+                record = StatusRecord(
+                    homework_name, status, verdict,
+                    int(self._clock() if updated_at is None else updated_at)
+                )
+                entry.latest[homework_name] = record
+                entry.history.append(record)
+                del entry.history[:-self.history_size]
+
+    def touch(self, chat_id, create=True):
+        """Продлевает свежесть данных чата после опроса.
+        Без create данные о чате не заводятся, если их нет.
+        Возвращает False, если свежих данных о чате не было.
+        """
+        with self._lock:
+            key = str(chat_id)
+            existed = self._entry(key) is not None
+            if existed or create:
+                self._entry(key, create=True)
+            return existed
+
+    def latest(self, chat_id):
+        """Последние статусы работ чата, начиная с самой свежей."""
+        with self._lock:
+            entry = self._entry(str(chat_id))
+            if entry is None:
+                return []
+            return sorted(
+                entry.latest.values(),
+                key=lambda record: record.updated_at,
+                reverse=True
+            )
+
+    def history(self, chat_id, limit=10):
+        """Последние limit изменений статусов, начиная с самого свежего."""
+        with self._lock:
+            entry = self._entry(str(chat_id))
+            if entry is None:
+                return []
+            return entry.history[::-1][:limit]
+
+    def __len__(self):
+        return len(self._chats)
+
+    def __contains__(self, chat_id):
+        with self._lock:
+            entry = self._chats.get(str(chat_id))
+            return entry is not None and entry.expires_at > self._clock()
+
+    def _entry(self, key, create=False):
+        now = self._clock()
+        entry = self._chats.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._chats[key]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = self._chats[key] = _ChatEntry()
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(key)
+        if create:
+            entry.expires_at = now + self.ttl
+        return entry
@@ -0,0 +1,265 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from collections import namedtuple
+
+Tenant = namedtuple('Tenant', ['chat_id', 'practicum_token'])
+
+
+class TenantState:
+    """Состояние опроса одного подписчика."""
+
+    __slots__ = (
+        'tenant', 'current_timestamp', 'last_msg', 'next_poll_at',
+        'fingerprint', 'seeded', 'rejected'
+    )
+
+    def __init__(self, tenant, current_timestamp):
+        self.tenant = tenant
+        self.current_timestamp = current_timestamp
+        self.last_msg = ''
+        self.next_poll_at = None
+        self.fingerprint = None
+        self.seeded = False
+        self.rejected = ''
+
+
+class StaticSource:
+    """Неизменный список подписчиков, например из переменных окружения."""
+
+    def __init__(self, tenants):
+        self._tenants = list(tenants)
+
+    def changes(self):
+        """Отдаёт всех подписчиков при первом вызове."""
+        tenants, self._tenants = self._tenants, []
+        return {tenant.chat_id: tenant for tenant in tenants}, set()
+
+
+class JsonFileSource:
+    """Подписчики в JSON-файле.
+    Формат: [{"chat_id": "...", "practicum_token": "..."}, ...].
+    Файл перечитывается только при изменении времени или размера.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._tenants = {}
+
+    def changes(self):
+        """Разница с прошлым прочтением: новые/изменённые и удалённые."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Файл могут заменять через удаление: подписчики остаются.
+            if self._stamp is not None:
+                logging.warning(f'Реестр {self.path} не найден')
+            self._stamp = None
+            return {}, set()
+        except OSError as error:
+            logging.error(f'Не удалось прочитать реестр {self.path}: {error}')
+            return {}, set()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return {}, set()
+        try:
+            tenants = self._load()
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logging.error(f'Не удалось прочитать реестр {self.path}: {error}')
+            return {}, set()
+        upserts = {
+            chat_id: tenant for chat_id, tenant in tenants.items()
+            if self._tenants.get(chat_id) != tenant
+        }
+        removed = set(self._tenants) - set(tenants)
+        self._stamp, self._tenants = stamp, tenants
+        return upserts, removed
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as registry:
+            return {
+                str(row['chat_id']): Tenant(
+                    str(row['chat_id']), row['practicum_token']
+                )
+                for row in json.load(registry)
+            }
+
+
+class SqliteSource:
+    """Подписчики в таблице SQLite.
+    Каждое изменение получает новый номер версии, а удаление только
+    помечает строку, поэтому changes() читает лишь строки, изменённые
+    после прошлого вызова.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._version = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS tenants ('
+                'chat_id TEXT PRIMARY KEY, '
+                'practicum_token TEXT NOT NULL, '
+                'version INTEGER NOT NULL, '
+                'deleted INTEGER NOT NULL DEFAULT 0)'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS tenants_version '
+                'ON tenants (version)'
+            )
+
+    def changes(self):
+        """Строки, изменённые после прошлого вызова."""
+        rows = self._connection.execute(
+            'SELECT chat_id, practicum_token, version, deleted '
+            'FROM tenants WHERE version > ? ORDER BY version',
+            (self._version,)
+        ).fetchall()
+        upserts, removed = {}, set()
+        for chat_id, practicum_token, version, deleted in rows:
+            self._version = version
+            if deleted:
+                upserts.pop(chat_id, None)
+                removed.add(chat_id)
+            else:
+                removed.discard(chat_id)
+                upserts[chat_id] = Tenant(chat_id, practicum_token)
+        return upserts, removed
+
+    def upsert(self, chat_id, practicum_token):
+        """Добавляет подписчика или меняет его токен."""
+        with self._connection:
+            self._connection.execute(
+                'INSERT INTO tenants (chat_id, practicum_token, version) '
+                'VALUES (?, ?, (SELECT COALESCE(MAX(version), 0) + 1 '
+                'FROM tenants)) '
+                'ON CONFLICT (chat_id) DO UPDATE SET '
+                'practicum_token = excluded.practicum_token, '
+                'version = excluded.version, deleted = 0',
+                (str(chat_id), practicum_token)
+            )
+
+    def remove(self, chat_id):
+        """Помечает подписчика удалённым."""
+        with self._connection:
+            self._connection.execute(
+                'UPDATE tenants SET deleted = 1, version = '
+                '(SELECT MAX(version) + 1 FROM tenants) WHERE chat_id = ?',
+                (str(chat_id),)
+            )
+
+
+def open_source(path):
+    """Источник подписчиков по расширению файла."""
+    if path.endswith('.json'):
+        return JsonFileSource(path)
+    return SqliteSource(path)
+
+
+class TenantRegistry:
+    """Подписчики бота и расписание их опроса.
+    Изменения источника применяются точечно: затрагиваются только
+    добавленные, удалённые и изменённые подписчики, состояние остальных
+    сохраняется. Первый опрос новых подписчиков сдвигается на зависящую
+    от chat_id долю spread секунд, чтобы добавленные разом подписчики
+    не опрашивались тоже разом.
+    """
+
+    def __init__(self, source, check_interval=30, spread=0):
+        self.source = source
+        self.check_interval = check_interval
+        self.spread = spread
+        self._states = {}
+        self._schedule = []
+        self._seq = itertools.count()
+        self._next_check = float('-inf')
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, chat_id):
+        """Состояние подписчика или None."""
+        return self._states.get(chat_id)
+
+    def refresh(self, now):
+        """Применяет изменения источника не чаще check_interval.
+        Ошибка источника не меняет текущий список подписчиков.
+        """
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            upserts, removed = self.source.changes()
+        except (OSError, sqlite3.Error) as error:
+            logging.error(
+                f'Не удалось обновить реестр подписчиков: {error}. '
+                f'Опрос продолжается по текущему списку'
+            )
+            return
+        if upserts or removed:
+            self.apply(upserts, removed, now)
+
+    def apply(self, upserts, removed, now):
+        """Применяет разницу к реестру."""
+        for chat_id in removed:
+            self._states.pop(chat_id, None)
+        added = 0
+        for chat_id, tenant in upserts.items():
+            state = self._states.get(chat_id)
+            if state is None:
+                state = self._states[chat_id] = TenantState(tenant, int(now))
+                self.schedule(state, now + self.offset(chat_id))
+                added += 1
+                continue
+            if state.tenant == tenant:
+                continue
+            state.tenant = tenant
+            self.schedule(state, now)
+        logging.info(
+            f'Реестр подписчиков обновлён: добавлено {added}, '
+            f'изменено {len(upserts) - added}, удалено {len(removed)}, '
+            f'всего {len(self)}'
+        )
+
+    def offset(self, chat_id):
+        """Сдвиг первого опроса подписчика внутри spread."""
+        if not self.spread:
+            return 0
+        return zlib.crc32(str(chat_id).encode()) % self.spread
+
+    def schedule(self, state, at):
+        """Назначает следующий опрос подписчика."""
+        state.next_poll_at = at
+        heapq.heappush(self._schedule, (at, next(self._seq), state))
+
+    def due(self, now):
+        """Подписчики, опрос которых назначен не позже now."""
+        states = []
+        while self._schedule and self._schedule[0][0] <= now:
+            at, _, state = heapq.heappop(self._schedule)
+            if self._is_current(at, state):
+                states.append(state)
+        return states
+
+    def sleep_time(self, now):
+        """Пауза до ближайшего опроса, но не дольше check_interval."""
+        while self._schedule and not self._is_current(
+            self._schedule[0][0], self._schedule[0][2]
+        ):
+            heapq.heappop(self._schedule)
+        delay = self.check_interval
+        if self._schedule:
+            delay = min(delay, self._schedule[0][0] - now)
+        return max(0, delay)
+
+    def _is_current(self, at, state):
+        return (
+            self._states.get(state.tenant.chat_id) is state
+            and state.next_poll_at == at
+        )
@@ -0,0 +1,132 @@
+from types import SimpleNamespace
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import homework
+from clock import VirtualClock
+from delivery import ALERT, VERDICT, OutboundQueue
+from metrics import METRICS
+
+
+class FakeSender:
+
+    def __init__(self):
+        self.sent = []
+        self.error = None
+        self.chat_errors = {}
+
+    def __call__(self, bot, chat_id, message, context=None):
+        error = self.chat_errors.get(chat_id, self.error)
+        if error is not None:
+            raise SystemError('не отправилось') from error
+        self.sent.append(message)
+
+
+class TestOutboundQueue:
+
+    def test_verdicts_sent_first(self):
+        sender = FakeSender()
+        queue = OutboundQueue(sender, name='test_order')
+        queue.put(1, 'сбой 1', ALERT)
+        queue.put(1, 'вердикт 1', VERDICT)
+        queue.put(1, 'сбой 2', ALERT)
+        queue.put(1, 'вердикт 2')
+        assert len(queue.flush(bot=None)) == 4
+        assert sender.sent == ['вердикт 1', 'вердикт 2', 'сбой 1', 'сбой 2']
+        assert len(queue) == 0
+        assert METRICS.get('test_order_queue_depth') == 0
+
+    def test_alerts_merged_and_shed(self):
+        sender = FakeSender()
+        queue = OutboundQueue(sender, max_alerts=2, name='test_shed')
+        queue.put(1, 'сбой 1', ALERT)
+        queue.put(1, 'сбой 2', ALERT)
+        queue.put(1, 'сбой 2', ALERT)
+        queue.put(1, 'сбой 3', ALERT)
+        for number in range(5):
+            queue.put(1, f'вердикт {number}')
+        assert len(queue) == 7
+        assert METRICS.get('test_shed_shed') == 1
+        assert METRICS.get('test_shed_merged') == 1
+        queue.flush(bot=None)
+        assert sender.sent[5:] == ['сбой 2 (повторов: 2)', 'сбой 3'], (
+            'Повторы оповещений должны склеиваться, '
+            'а самые старые — отбрасываться'
+        )
+
+    def test_throttled_delivery_keeps_messages(self):
+        now = [0]
+        sender = FakeSender()
+        queue = OutboundQueue(
+            sender, name='test_throttle', clock=lambda: now[0]
+        )
+        queue.put(1, 'вердикт')
+        sender.error = RetryAfter(30)
+        assert queue.flush(bot=None) == []
+        sender.error = None
+        now[0] = 10
+        assert queue.flush(bot=None) == [], (
+            'До истечения RetryAfter сообщения не должны отправляться'
+        )
+        now[0] = 31
+        assert queue.flush(bot=None) == [(1, 'вердикт')]
+        assert sender.sent == ['вердикт']
+
+    def test_undeliverable_chat_does_not_block_others(self):
+        sender = FakeSender()
+        sender.chat_errors['blocked'] = BadRequest('Chat not found')
+        queue = OutboundQueue(sender, name='test_blocked')
+        queue.put('blocked', 'вердикт')
+        queue.put('ok', 'вердикт')
+        queue.put('ok2', 'вердикт')
+        assert queue.flush(bot=None) == [('ok', 'вердикт'), ('ok2', 'вердикт')]
+        assert len(queue) == 0, (
+            'Сообщение в недоступный чат должно удаляться из очереди'
+        )
+        assert METRICS.get('test_blocked_undeliverable') == 1
+
+    def test_failing_chat_retried_with_backoff(self):
+        now = [0]
+        sender = FakeSender()
+        sender.chat_errors['flaky'] = NetworkError('timed out')
+        queue = OutboundQueue(
+            sender, name='test_flaky', clock=lambda: now[0],
+            retry_backoff=10
+        )
+        queue.put('flaky', 'вердикт')
+        queue.put('ok', 'вердикт')
+        assert queue.flush(bot=None) == [('ok', 'вердикт')], (
+            'Ошибка в одном чате не должна задерживать другие чаты'
+        )
+        assert len(queue) == 1
+        del sender.chat_errors['flaky']
+        now[0] = 5
+        assert queue.flush(bot=None) == [], (
+            'Повтор должен ждать паузы после ошибки'
+        )
+        now[0] = 10
+        assert queue.flush(bot=None) == [('flaky', 'вердикт')]
+        assert len(queue) == 0
+
+    def test_outbox_retries_on_bot_clock(self, monkeypatch):
+        clock = VirtualClock(start=1000)
+        monkeypatch.setattr(homework, 'CLOCK', clock)
+        sent = []
+        errors = [NetworkError('timed out')]
+
+        def send_message(chat_id, text):
+            if errors:
+                raise errors.pop()
+            sent.append(text)
+
+        bot = SimpleNamespace(send_message=send_message)
+        homework.OUTBOX.clear()
+        homework.OUTBOX.put('1', 'вердикт')
+        try:
+            assert homework.OUTBOX.flush(bot) == []
+            clock.sleep(homework.OUTBOX.retry_backoff)
+            assert homework.OUTBOX.flush(bot) == [('1', 'вердикт')], (
+                'Пауза перед повтором должна идти по часам бота CLOCK'
+            )
+        finally:
+            homework.OUTBOX.clear()
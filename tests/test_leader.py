@@ -0,0 +1,141 @@
+import sqlite3
+
+import homework
+from commands import CommandPolling
+from leader import CheckpointBuffer, LeaseElection
+from tenants import StaticSource, Tenant, TenantRegistry
+from utils import FakeClock
+
+
+class TestLeaseElection:
+
+    def make_pair(self, tmp_path):
+        clock = FakeClock(now=1000)
+        path = str(tmp_path / 'lease.db')
+        first = LeaseElection(path, ttl=10, holder='first', clock=clock)
+        second = LeaseElection(path, ttl=10, holder='second', clock=clock)
+        return clock, first, second
+
+    def test_single_leader_and_failover(self, tmp_path):
+        clock, first, second = self.make_pair(tmp_path)
+        assert first.try_acquire()
+        assert not second.try_acquire(), (
+            'Пока аренда не истекла, ведущей может быть только одна копия'
+        )
+        clock.now += 5
+        assert first.try_acquire(), 'Владелец должен продлевать аренду'
+        clock.now += 9
+        assert not second.try_acquire()
+        clock.now += 2
+        assert not first.is_leader, (
+            'Без продления аренда должна истекать и у владельца'
+        )
+        assert second.try_acquire(), (
+            'Резервная копия должна забирать истёкшую аренду'
+        )
+        assert not first.try_acquire()
+
+    def test_release_hands_over_immediately(self, tmp_path):
+        clock, first, second = self.make_pair(tmp_path)
+        first.try_acquire()
+        first.release()
+        assert not first.is_leader
+        assert second.try_acquire()
+
+    def test_takeover_restores_checkpoints(self, tmp_path):
+        clock, first, second = self.make_pair(tmp_path)
+        registry = TenantRegistry(StaticSource([Tenant('1', 'token')]))
+        registry.refresh(now=0)
+        state = registry.get('1')
+        state.current_timestamp, state.last_msg = 500, 'статус'
+        first.save_checkpoints([state])
+        state.current_timestamp, state.last_msg = 0, ''
+        homework.OUTBOX.put('1', 'неотправленное')
+
+        second.try_acquire()
+        homework.await_leadership(second, registry)
+
+        assert (state.current_timestamp, state.last_msg) == (500, 'статус')
+        assert len(homework.OUTBOX) == 0, (
+            'Сообщения, сформированные до получения аренды, '
+            'не должны отправляться'
+        )
+
+    def test_checkpoint_waits_for_delivery(self, tmp_path):
+        clock, first, second = self.make_pair(tmp_path)
+        first.try_acquire()
+        registry = TenantRegistry(StaticSource([Tenant('1', 'token')]))
+        registry.refresh(now=0)
+        state = registry.get('1')
+        checkpoints = CheckpointBuffer(first)
+
+        before = state.current_timestamp, state.last_msg
+        state.current_timestamp, state.last_msg = 500, 'статус'
+        checkpoints.polled(state, before)
+        checkpoints.delivered([], queued=1)
+        checkpoints.save()
+        assert first.load_checkpoints() == {}, (
+            'Точка с недоставленным сообщением не должна сохраняться'
+        )
+
+        before = state.current_timestamp, state.last_msg
+        state.current_timestamp = 600
+        checkpoints.polled(state, before)
+        checkpoints.delivered([('1', 'статус')], queued=0)
+        checkpoints.save()
+        assert first.load_checkpoints() == {'1': (600, 'статус')}
+
+    def test_failed_checkpoint_saved_next_time(self, tmp_path):
+        clock, first, second = self.make_pair(tmp_path)
+        registry = TenantRegistry(StaticSource([Tenant('1', 'token')]))
+        registry.refresh(now=0)
+        state = registry.get('1')
+        checkpoints = CheckpointBuffer(first)
+        connection = sqlite3.connect(str(tmp_path / 'lease.db'))
+        with connection:
+            connection.execute('ALTER TABLE checkpoints RENAME TO moved')
+
+        before = state.current_timestamp, state.last_msg
+        state.current_timestamp = 500
+        checkpoints.polled(state, before)
+        checkpoints.save()
+        assert not first.save_checkpoints([state]), (
+            'Ошибка базы не должна выбрасываться из save_checkpoints'
+        )
+
+        with connection:
+            connection.execute('ALTER TABLE moved RENAME TO checkpoints')
+        checkpoints.save()
+        connection.close()
+        assert first.load_checkpoints() == {'1': (500, '')}
+
+
+class FakeUpdater:
+
+    def __init__(self, token, status_cache):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+class TestCommandPolling:
+
+    def test_restart_creates_new_updater(self):
+        updaters = []
+
+        def start(token, status_cache):
+            updaters.append(FakeUpdater(token, status_cache))
+            return updaters[-1]
+
+        commands = CommandPolling('token', None, start=start)
+        commands.stop()
+        commands.start()
+        commands.start()
+        assert commands.running and len(updaters) == 1
+        commands.stop()
+        assert not commands.running and updaters[0].stopped, (
+            'Резервная копия не должна опрашивать getUpdates'
+        )
+        commands.start()
+        assert len(updaters) == 2 and not updaters[1].stopped
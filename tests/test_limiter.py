@@ -0,0 +1,126 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import homework
+from delivery import OutboundQueue
+from exceptions import APIConnectionError
+from limiter import AdaptiveLimiter
+from metrics import METRICS
+from tenants import Tenant, TenantState
+
+
+class TestAdaptiveLimiter:
+
+    def test_limit_grows_on_fast_responses(self):
+        limiter = AdaptiveLimiter('test_grow', initial_limit=2, max_limit=4)
+        for _ in range(20):
+            with limiter.slot():
+                pass
+        assert limiter.limit == 4, (
+            'Лимит должен расти до max_limit при быстрых успешных ответах'
+        )
+        assert METRICS.get('test_grow_concurrency_limit') == 4, (
+            'Текущий лимит должен публиковаться в метриках'
+        )
+
+    def test_limit_drops_on_connection_error(self):
+        limiter = AdaptiveLimiter('test_drop', initial_limit=8)
+        with pytest.raises(APIConnectionError):
+            with limiter.slot():
+                raise APIConnectionError('boom')
+        assert limiter.limit == 4, (
+            'Ошибка соединения должна уменьшать лимит вдвое'
+        )
+        assert limiter.in_flight == 0
+
+    def test_limit_drops_on_slow_response(self):
+        limiter = AdaptiveLimiter(
+            'test_slow', initial_limit=8, latency_threshold=0
+        )
+        limiter.acquire()
+        limiter.release(time.monotonic(), latency=1)
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
+
+    def test_single_decrease_per_burst(self):
+        limiter = AdaptiveLimiter('test_burst', initial_limit=8)
+        started = time.monotonic()
+        limiter.acquire()
+        limiter.acquire()
+        limiter.release(started, 0, failed=True)
+        limiter.release(started, 0, failed=True)
+        assert limiter.limit == 4, (
+            'Ошибки запросов, начатых до снижения лимита, '
+            'не должны снижать его повторно'
+        )
+
+    def test_acquire_respects_limit(self):
+        limiter = AdaptiveLimiter('test_full', initial_limit=1)
+        assert limiter.acquire(timeout=0)
+        assert not limiter.acquire(timeout=0)
+        with pytest.raises(APIConnectionError):
+            with limiter.slot(timeout=0):
+                pass
+
+    def test_request_timeout_tied_to_latency_threshold(self):
+        limiter = AdaptiveLimiter('test_timeout', latency_threshold=2.0)
+        assert limiter.request_timeout == 10
+        assert 0 < limiter.acquire_timeout < float('inf'), (
+            'Ожидание слота по умолчанию должно быть ограничено'
+        )
+
+    def test_no_warning_at_floor(self, caplog):
+        limiter = AdaptiveLimiter('test_floor', initial_limit=1)
+        caplog.set_level(logging.WARNING)
+        with pytest.raises(APIConnectionError):
+            with limiter.slot():
+                raise APIConnectionError('boom')
+        assert limiter.limit == 1
+        assert not caplog.records, (
+            'Лимит на минимуме не меняется, и предупреждать не о чем'
+        )
+
+    @pytest.mark.parametrize('status_code, congested', [
+        (401, False), (403, False), (404, False),
+        (429, True), (500, True), (503, True),
+    ])
+    def test_only_congestion_lowers_limit(self, monkeypatch, status_code,
+                                          congested):
+        limiter = AdaptiveLimiter('test_status', initial_limit=8)
+        monkeypatch.setattr(homework, 'API_LIMITER', limiter)
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: SimpleNamespace(status_code=status_code)
+        )
+        with pytest.raises(APIConnectionError):
+            homework.fetch_statuses({}, 0)
+        assert (limiter.limit == 4) is congested, (
+            'Лимит должны снижать только сетевые ошибки, 429 и 5xx'
+        )
+
+    def test_network_error_lowers_limit(self):
+        limiter = AdaptiveLimiter('test_network', initial_limit=8)
+        with pytest.raises(requests.Timeout):
+            with limiter.slot():
+                raise requests.Timeout('read timed out')
+        assert limiter.limit == 4
+
+    def test_slot_timeout_not_reported_to_student(self, monkeypatch):
+        limiter = AdaptiveLimiter(
+            'test_busy', initial_limit=1, acquire_timeout=0
+        )
+        limiter.acquire()
+        outbox = OutboundQueue(homework.deliver)
+        monkeypatch.setattr(homework, 'API_LIMITER', limiter)
+        monkeypatch.setattr(homework, 'OUTBOX', outbox)
+        state = TenantState(Tenant('busy', 'token'), 0)
+
+        homework.poll_cycle(state)
+
+        assert len(outbox) == 0 and state.last_msg == '', (
+            'Нехватка слотов у самого бота не должна доходить до студента'
+        )
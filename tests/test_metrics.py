@@ -0,0 +1,45 @@
+import json
+import logging
+
+from metrics import Metrics, MetricsExporter
+from replay import simulate
+from utils import FakeClock, make_record
+
+
+class TestMetricsExporter:
+
+    def test_periodic_export_to_file(self, tmp_path):
+        path = tmp_path / 'metrics.jsonl'
+        metrics = Metrics()
+        clock = FakeClock(now=100)
+        exporter = MetricsExporter(
+            metrics, str(path), interval=60, clock=clock
+        )
+        metrics.set('practicum_api_concurrency_limit', 4)
+        assert exporter.maybe_export()
+        clock.now = 130
+        metrics.set('practicum_api_concurrency_limit', 8)
+        assert not exporter.maybe_export(), (
+            'Снимок не должен выгружаться чаще interval'
+        )
+        clock.now = 160
+        assert exporter.maybe_export()
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record['time'] for record in records] == [100, 160]
+        assert [
+            record['metrics']['practicum_api_concurrency_limit']
+            for record in records
+        ] == [4, 8]
+
+    def test_polling_loop_reports_metrics(self, caplog):
+        caplog.set_level(logging.INFO)
+        simulate([make_record(0, [])])
+        reports = [
+            record.getMessage() for record in caplog.records
+            if record.getMessage().startswith('Метрики: ')
+        ]
+        assert reports, 'Цикл опроса должен выгружать метрики'
+        snapshot = json.loads(reports[-1][len('Метрики: '):])
+        assert 'practicum_api_concurrency_limit' in snapshot
+        assert 'outbound_queue_depth' in snapshot
@@ -0,0 +1,42 @@
+import time
+
+from profiling import Profiler
+
+
+def busy_function(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+class TestProfiler:
+
+    def test_cpu_report(self, tmp_path):
+        profiler = Profiler(str(tmp_path), interval=0.001)
+        profiler.toggle_cpu()
+        with profiler.section('poll_cycle'):
+            busy_function(0.1)
+        busy_function(0.05)
+        profiler.toggle_cpu()
+        assert not profiler.cpu_enabled
+
+        reports = list(tmp_path.glob('cpu-*.txt'))
+        assert len(reports) == 1, 'При выключении должен сохраняться отчёт'
+        report = reports[0].read_text(encoding='utf-8')
+        assert 'Секция poll_cycle' in report
+        assert 'busy_function' in report, (
+            'В отчёт должны попадать функции из отмеченной секции'
+        )
+
+    def test_memory_report(self, tmp_path):
+        profiler = Profiler(str(tmp_path))
+        profiler.toggle_memory()
+        assert profiler.memory_enabled
+        data = [bytearray(1024) for _ in range(100)]
+        profiler.toggle_memory()
+        assert not profiler.memory_enabled
+        assert data
+
+        reports = list(tmp_path.glob('memory-*.txt'))
+        assert len(reports) == 1
+        assert 'test_profiling.py' in reports[0].read_text(encoding='utf-8')
@@ -0,0 +1,105 @@
+import requests
+
+import homework
+from clock import VirtualClock
+from exceptions import SimulationFinished
+from replay import Recorder, Replayer, ReplayResponse, load_records, simulate
+from utils import make_record
+
+
+class TestReplay:
+
+    def test_virtual_clock_finishes(self):
+        clock = VirtualClock(start=100, until=700)
+        clock.sleep(300)
+        assert clock.time() == 400
+        try:
+            clock.sleep(300)
+        except SimulationFinished:
+            pass
+        else:
+            assert False, 'Часы должны останавливать симуляцию по until'
+
+    def test_recorder_writes_responses(self, tmp_path):
+        path = tmp_path / 'responses.jsonl'
+
+        def fake_get(url, params=None, **kwargs):
+            return ReplayResponse(200, '{"homeworks": []}')
+
+        recorder = Recorder(str(path), get=fake_get, clock=VirtualClock(5))
+        recorder.get(
+            homework.ENDPOINT, params={'from_date': 1},
+            headers={'Authorization': 'OAuth secret'}
+        )
+        records = load_records(str(path))
+        assert records == [{
+            'at': 5,
+            'params': {'from_date': 1},
+            'status_code': 200,
+            'text': '{"homeworks": []}',
+        }]
+        assert 'secret' not in path.read_text(), (
+            'Токены не должны попадать в запись'
+        )
+
+    def test_replayer_serves_by_virtual_time(self):
+        clock = VirtualClock()
+        replayer = Replayer([make_record(0, []), make_record(100, [])], clock)
+        clock.now = 99
+        assert replayer.get(homework.ENDPOINT).json()['current_date'] == 0
+        clock.now = 150
+        assert replayer.get(homework.ENDPOINT).json()['current_date'] == 100
+
+    def test_simulate_day_of_polling(self):
+        day = 24 * 60 * 60
+        reviewing = [{'homework_name': 'hw1', 'status': 'reviewing'}]
+        approved = [{'homework_name': 'hw1', 'status': 'approved'}]
+        records = [
+            make_record(0, []),
+            make_record(day // 3, reviewing),
+            make_record(day // 2, [], status_code=500),
+            make_record(2 * day // 3, approved),
+            make_record(day, approved),
+        ]
+        real_get = requests.get
+        real_clock = homework.CLOCK
+
+        bot, replayer = simulate(records)
+
+        assert requests.get is real_get and homework.CLOCK is real_clock
+        # Проверка учётных данных живёт не дольше суток и повторяется.
+        probes, seeds = 2, 1
+        assert replayer.requests == (
+            day // homework.RETRY_TIME + 1 + probes + seeds
+        )
+        texts = [text for _, _, text in bot.sent]
+        assert texts == [
+            homework.parse_status(reviewing[0]),
+            'Сбой в работе программы: Не удалось подключиться к API '
+            'код ответа: 500',
+            homework.parse_status(approved[0]),
+        ]
+
+    def test_simulate_many_tenants(self):
+        approved = [{'homework_name': 'hw1', 'status': 'approved'}]
+        records = [make_record(0, []), make_record(3000, approved)]
+
+        bot, replayer = simulate(records, tenants=50)
+
+        probes = seeds = 50
+        assert replayer.requests == (
+            50 * (3600 // homework.RETRY_TIME) + probes + seeds
+        )
+        assert len({chat_id for _, chat_id, _ in bot.sent}) == 50, (
+            'Каждый подписчик должен получить своё сообщение'
+        )
+
+    def test_simulate_quarantines_invalid_tenants(self):
+        records = [make_record(0, [], status_code=401)]
+
+        bot, replayer = simulate(records, tenants=3)
+
+        assert replayer.requests == 3, (
+            'Подписчики с недействительным токеном не должны опрашиваться'
+        )
+        assert bot.sent == []
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import homework
+from metrics import METRICS, Metrics
+from replay import simulate
+from response_cache import fingerprint
+from utils import make_record
+
+
+class TestResponseCache:
+
+    def test_fingerprint_ignores_current_date(self):
+        first = b'{"homeworks": [], "current_date": 1000198000}'
+        second = b'{"homeworks": [], "current_date": 1000198600}'
+        changed = b'{"homeworks": [{}], "current_date": 1000198600}'
+        assert fingerprint(first) == fingerprint(second), (
+            'Ответы, отличающиеся только current_date, должны совпадать'
+        )
+        assert fingerprint(first) != fingerprint(changed)
+
+    def test_idle_polls_short_circuit(self, monkeypatch):
+        approved = [{'homework_name': 'hw1', 'status': 'approved'}]
+        records = [
+            make_record(0, []),
+            make_record(3000, approved),
+            make_record(3001, []),
+        ]
+        hits = METRICS.get('response_cache_hits')
+        misses = METRICS.get('response_cache_misses')
+        parsed = []
+
+        def counting_check_response(response):
+            parsed.append(response)
+            return check_response(response)
+
+        check_response = homework.check_response
+        monkeypatch.setattr(
+            homework, 'check_response', counting_check_response
+        )
+
+        bot, replayer = simulate(records, until=7 * homework.RETRY_TIME)
+
+        assert [text for _, _, text in bot.sent] == [
+            homework.parse_status(approved[0])
+        ]
+        assert len(parsed) == 3, (
+            'Разбираться должны только загрузка истории, первый ответ '
+            'и ответы с изменениями'
+        )
+        assert METRICS.get('response_cache_misses') - misses == 2
+        assert METRICS.get('response_cache_hits') - hits == 5
+
+    def test_hit_rate_consistent_across_threads(self):
+        metrics = Metrics()
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            list(pool.map(
+                lambda number: metrics.record_hit('test', number % 4 == 0),
+                range(4000)
+            ))
+        assert metrics.get('test_hits') == 1000
+        assert metrics.get('test_misses') == 3000
+        assert metrics.get('test_hit_rate') == 0.25, (
+            'Доля попаданий должна считаться по согласованным счётчикам'
+        )
@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+
+import requests
+
+import homework
+from clock import VirtualClock
+from commands import NO_DATA_MESSAGE, history_command, status_command
+from delivery import OutboundQueue
+from replay import simulate
+from status_cache import StatusCache
+from tenants import Tenant, TenantState
+from utils import FakeClock, make_record
+
+
+class FakeUpdate:
+
+    def __init__(self, chat_id):
+        self.effective_chat = SimpleNamespace(id=chat_id)
+        self.message = self
+        self.replies = []
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+
+class TestStatusCache:
+
+    def test_latest_and_history(self):
+        cache = StatusCache()
+        cache.record(1, 'hw1', 'reviewing', 'На проверке')
+        cache.record(1, 'hw1', 'reviewing', 'На проверке')
+        cache.record(1, 'hw1', 'approved', 'Принято')
+        latest = cache.latest(1)
+        assert [record.status for record in latest] == ['approved']
+        history = cache.history('1')
+        assert [record.status for record in history] == [
+            'approved', 'reviewing'
+        ], (
+            'История должна содержать только изменения статуса, '
+            'начиная с самого свежего'
+        )
+
+    def test_ttl_expiry_and_touch(self):
+        clock = FakeClock()
+        cache = StatusCache(ttl=10, clock=clock)
+        cache.record(1, 'hw1', 'approved', 'Принято')
+        clock.now = 9
+        cache.touch(1)
+        clock.now = 15
+        assert cache.latest(1), 'touch должен продлевать свежесть данных'
+        clock.now = 20
+        assert not cache.latest(1), 'Устаревшие данные должны удаляться'
+
+    def test_touch_without_create(self):
+        clock = FakeClock()
+        cache = StatusCache(ttl=10, clock=clock)
+        assert not cache.touch(1, create=False)
+        assert 1 not in cache and len(cache) == 0
+        cache.record(1, 'hw1', 'approved', 'Принято')
+        clock.now = 9
+        assert cache.touch(1, create=False)
+        clock.now = 15
+        assert 1 in cache
+
+    def test_lru_eviction(self):
+        cache = StatusCache(max_chats=2)
+        cache.record(1, 'hw1', 'approved', 'Принято')
+        cache.record(2, 'hw2', 'approved', 'Принято')
+        cache.latest(1)
+        cache.record(3, 'hw3', 'approved', 'Принято')
+        assert len(cache) == 2
+        assert cache.latest(1) and cache.latest(3)
+        assert not cache.latest(2), (
+            'Вытесняться должен давно не использованный чат'
+        )
+
+    def test_commands_read_from_cache(self):
+        cache = StatusCache()
+        cache.record(1, 'hw1', 'approved', 'Принято')
+        context = SimpleNamespace(bot_data={'status_cache': cache})
+
+        update = FakeUpdate(1)
+        status_command(update, context)
+        history_command(update, context)
+        assert '"hw1": Принято' in update.replies[0]
+        assert '"hw1": Принято' in update.replies[1]
+
+        update = FakeUpdate(2)
+        status_command(update, context)
+        assert update.replies == [NO_DATA_MESSAGE]
+
+    def test_seed_fills_cache_without_notifications(self, monkeypatch):
+        requested = []
+
+        def mock_get(url, params=None, **kwargs):
+            requested.append(params['from_date'])
+            return SimpleNamespace(
+                status_code=200,
+                json=lambda: {'homeworks': [{
+                    'homework_name': 'hw_old',
+                    'status': 'approved',
+                    'date_updated': '2020-02-13T14:40:57Z',
+                }], 'current_date': 1},
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(homework, 'STATUS_CACHE', StatusCache())
+        queued = len(homework.OUTBOX)
+        state = TenantState(Tenant('seed_chat', 'token'), 100)
+
+        homework.seed_statuses(state)
+
+        assert requested == [0], 'История должна загружаться с from_date=0'
+        assert state.seeded
+        [record] = homework.STATUS_CACHE.latest('seed_chat')
+        assert record.homework_name == 'hw_old'
+        assert record.updated_at == 1581604857, (
+            'Время изменения должно браться из date_updated'
+        )
+        assert len(homework.OUTBOX) == queued, (
+            'Загрузка истории не должна отправлять уведомления'
+        )
+
+    def test_outage_keeps_statuses(self, monkeypatch):
+        approved = [{'homework_name': 'hw1', 'status': 'approved'}]
+        hour = 60 * 60
+        records = [
+            make_record(0, approved),
+            make_record(homework.RETRY_TIME, [], status_code=500),
+            make_record(homework.RETRY_TIME + hour, []),
+        ]
+        virtual_now = [0]
+
+        def virtual_time():
+            if isinstance(homework.CLOCK, VirtualClock):
+                virtual_now[0] = homework.CLOCK.time()
+            return virtual_now[0]
+
+        cache = StatusCache(ttl=3 * homework.RETRY_TIME, clock=virtual_time)
+        monkeypatch.setattr(homework, 'STATUS_CACHE', cache)
+
+        simulate(records, until=2 * hour + homework.RETRY_TIME)
+
+        assert [record.homework_name for record in cache.latest('0')] == [
+            'hw1'
+        ], 'Сбои опроса не должны стирать известные статусы'
+
+    def test_evicted_chat_reseeded(self, monkeypatch):
+        seeds = []
+
+        def mock_get(url, params=None, **kwargs):
+            if params['from_date'] == 0:
+                seeds.append(params)
+            return SimpleNamespace(
+                status_code=200,
+                content=b'{"homeworks": []}',
+                json=lambda: {'homeworks': [{
+                    'homework_name': 'hw1', 'status': 'approved'
+                }]},
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        cache = StatusCache(max_chats=1)
+        monkeypatch.setattr(homework, 'STATUS_CACHE', cache)
+        monkeypatch.setattr(
+            homework, 'OUTBOX', OutboundQueue(homework.deliver)
+        )
+        first = TenantState(Tenant('first', 'token'), 100)
+        second = TenantState(Tenant('second', 'token'), 100)
+
+        homework.poll_tenant(first)
+        homework.poll_tenant(second)
+        assert not cache.latest('first')
+        homework.poll_tenant(first)
+
+        assert len(seeds) == 3, (
+            'Вытесненный из кэша чат должен загружать историю заново'
+        )
+        assert [record.homework_name for record in cache.latest('first')] == [
+            'hw1'
+        ]
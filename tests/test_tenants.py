@@ -0,0 +1,141 @@
+import json
+import sqlite3
+
+from tenants import (JsonFileSource, SqliteSource, StaticSource, Tenant,
+                     TenantRegistry)
+
+
+class TestTenantSources:
+
+    def test_json_source_diff(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        source = JsonFileSource(str(path))
+        assert source.changes() == ({}, set())
+
+        path.write_text(json.dumps([
+            {'chat_id': 1, 'practicum_token': 'a'},
+            {'chat_id': 2, 'practicum_token': 'b'},
+        ]))
+        upserts, removed = source.changes()
+        assert set(upserts) == {'1', '2'} and not removed
+        assert source.changes() == ({}, set()), (
+            'Неизменённый файл не должен перечитываться'
+        )
+
+        path.write_text(json.dumps([
+            {'chat_id': 1, 'practicum_token': 'a'},
+            {'chat_id': 3, 'practicum_token': 'cc'},
+        ]))
+        upserts, removed = source.changes()
+        assert upserts == {'3': Tenant('3', 'cc')}
+        assert removed == {'2'}
+
+    def test_sqlite_source_incremental(self, tmp_path):
+        source = SqliteSource(str(tmp_path / 'tenants.db'))
+        source.upsert(1, 'a')
+        source.upsert(2, 'b')
+        upserts, removed = source.changes()
+        assert set(upserts) == {'1', '2'} and not removed
+
+        source.upsert(2, 'bb')
+        source.remove(1)
+        upserts, removed = source.changes()
+        assert upserts == {'2': Tenant('2', 'bb')}
+        assert removed == {'1'}
+        assert source.changes() == ({}, set()), (
+            'Повторно должны читаться только новые изменения'
+        )
+
+    def test_json_source_ignores_broken_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text('[{"chat_id": 1, "practicum_token": "a"}]')
+        source = JsonFileSource(str(path))
+        source.changes()
+        path.write_text('[{"chat_id": 1, ')
+        assert source.changes() == ({}, set()), (
+            'Недописанный файл не должен удалять подписчиков'
+        )
+
+    def test_json_source_keeps_tenants_without_file(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text('[{"chat_id": 1, "practicum_token": "a"}]')
+        source = JsonFileSource(str(path))
+        source.changes()
+        path.unlink()
+        assert source.changes() == ({}, set()), (
+            'Пропавший файл не должен удалять подписчиков'
+        )
+        path.write_text('[{"chat_id": 1, "practicum_token": "a"}]')
+        assert source.changes() == ({}, set()), (
+            'Вернувшийся файл с теми же подписчиками ничего не меняет'
+        )
+
+
+class FailingSource:
+
+    def changes(self):
+        raise sqlite3.OperationalError('database is locked')
+
+
+class TestTenantRegistry:
+
+    def test_source_error_keeps_tenants(self):
+        registry = TenantRegistry(
+            StaticSource([Tenant('1', 'a')]), check_interval=30
+        )
+        registry.refresh(now=0)
+        registry.source = FailingSource()
+        registry.refresh(now=30)
+        assert registry.get('1') is not None, (
+            'Ошибка источника не должна менять список подписчиков'
+        )
+
+    def test_incremental_apply_keeps_state(self):
+        registry = TenantRegistry(StaticSource([
+            Tenant('1', 'a'), Tenant('2', 'b')
+        ]), check_interval=30)
+        registry.refresh(now=0)
+        due = registry.due(now=0)
+        assert {state.tenant.chat_id for state in due} == {'1', '2'}
+        for state in due:
+            state.last_msg = 'статус'
+            registry.schedule(state, 600)
+
+        registry.apply({'2': Tenant('2', 'bb'), '3': Tenant('3', 'c')},
+                       {'1'}, now=100)
+        assert registry.get('1') is None
+        assert registry.get('2').last_msg == 'статус', (
+            'Изменение подписчика не должно сбрасывать его состояние'
+        )
+        due = registry.due(now=100)
+        assert {state.tenant.chat_id for state in due} == {'2', '3'}
+        assert registry.due(now=600) == [], (
+            'Удалённые и перенесённые подписчики не должны опрашиваться '
+            'по старому расписанию'
+        )
+
+    def test_sleep_time(self):
+        registry = TenantRegistry(
+            StaticSource([Tenant('1', 'a')]), check_interval=30
+        )
+        registry.refresh(now=0)
+        assert registry.sleep_time(now=0) == 0
+        registry.schedule(registry.due(now=0)[0], 10)
+        assert registry.sleep_time(now=0) == 10
+        registry.schedule(registry.due(now=10)[0], 610)
+        assert registry.sleep_time(now=10) == 30
+
+    def test_first_polls_spread(self):
+        tenants = [Tenant(str(chat_id), 'token') for chat_id in range(10000)]
+        registry = TenantRegistry(StaticSource(tenants), spread=600)
+        registry.refresh(now=0)
+        buckets = [0] * 10
+        for tenant in tenants:
+            at = registry.get(tenant.chat_id).next_poll_at
+            assert 0 <= at < 600
+            buckets[int(at) // 60] += 1
+        assert min(buckets) > 800 and max(buckets) < 1200, (
+            'Первые опросы новых подписчиков должны распределяться '
+            'по всему интервалу spread'
+        )
+        assert len(registry.due(now=0)) < 100
@@ -0,0 +1,128 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from delivery import OutboundQueue
+from tenants import Tenant, TenantState
+from tracing import Tracer
+
+
+def read_spans(path):
+    """Участки из файла OTLP/JSON: по одному запросу на строку."""
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)['resourceSpans']:
+            for scope in resource['scopeSpans']:
+                spans.extend(scope['spans'])
+    return spans
+
+
+class TestTracer:
+
+    def test_spans_exported_as_json_lines(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(str(path), sample_rate=1, batch_size=100)
+        with tracer.trace('poll_cycle', chat_id='1'):
+            with tracer.span('fetch'):
+                pass
+            with pytest.raises(KeyError):
+                with tracer.span('render'):
+                    raise KeyError('status')
+            tracer.tag(outcome='error')
+        assert not path.exists(), 'Участки должны выгружаться пачками'
+        tracer.flush()
+
+        [request] = map(json.loads, path.read_text().splitlines())
+        [resource] = request['resourceSpans']
+        assert resource['resource']['attributes'] == [{
+            'key': 'service.name', 'value': {'stringValue': 'homework_bot'}
+        }]
+        by_name = {span['name']: span for span in read_spans(path)}
+        assert set(by_name) == {'poll_cycle', 'fetch', 'render'}
+        root = by_name['poll_cycle']
+        assert root['parentSpanId'] == ''
+        assert root['attributes'] == [
+            {'key': 'chat_id', 'value': {'stringValue': '1'}},
+            {'key': 'outcome', 'value': {'stringValue': 'error'}},
+        ]
+        for name in ('fetch', 'render'):
+            assert by_name[name]['traceId'] == root['traceId']
+            assert by_name[name]['parentSpanId'] == root['spanId']
+        assert by_name['fetch']['status']['code'] == 1
+        assert by_name['render']['status']['code'] == 2, (
+            'Исключение внутри участка должно отмечаться в его статусе'
+        )
+        assert int(root['endTimeUnixNano']) >= int(root['startTimeUnixNano'])
+
+    def test_unsampled_cycle_records_nothing(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(str(path), sample_rate=0)
+        with tracer.trace('poll_cycle') as span:
+            with tracer.span('fetch') as child:
+                tracer.tag(outcome='sent')
+        tracer.flush()
+        assert span is None and child is None
+        assert not path.exists()
+
+    def test_batch_flush(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(str(path), sample_rate=1, batch_size=4)
+        for _ in range(2):
+            with tracer.trace('poll_cycle'):
+                with tracer.span('fetch'):
+                    pass
+        assert len(read_spans(path)) == 4
+        assert len(path.read_text().splitlines()) == 1, (
+            'Пачка участков должна выгружаться одним запросом'
+        )
+
+    def test_resume_links_span_to_trace(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(str(path), sample_rate=1)
+        with tracer.trace('poll_cycle'):
+            with tracer.span('render'):
+                context = tracer.context()
+        with tracer.resume(context, 'send'):
+            pass
+        with tracer.resume(None, 'send') as span:
+            assert span is None
+        tracer.flush()
+        by_name = {span['name']: span for span in read_spans(path)}
+        assert by_name['send']['traceId'] == by_name['poll_cycle']['traceId']
+        assert by_name['send']['parentSpanId'] == (
+            by_name['poll_cycle']['spanId']
+        ), 'Отправка должна быть дочерним участком цикла опроса'
+
+    def test_poll_error_hides_token(self, tmp_path, monkeypatch):
+        import homework
+
+        def mock_get(url, headers=None, **kwargs):
+            raise requests.ConnectionError('connection refused')
+
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(str(path), sample_rate=1)
+        sent = []
+        bot = SimpleNamespace(
+            send_message=lambda chat_id, text: sent.append(text)
+        )
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(homework, 'TRACER', tracer)
+        monkeypatch.setattr(
+            homework, 'OUTBOX', OutboundQueue(homework.deliver)
+        )
+        state = TenantState(Tenant('1', 'secret-token'), 0)
+        state.seeded = True
+
+        homework.poll_tenant(state)
+        homework.OUTBOX.flush(bot)
+        tracer.flush()
+
+        assert sent and 'secret-token' not in sent[0], (
+            'Токен не должен попадать в оповещение об ошибке'
+        )
+        text = path.read_text()
+        assert 'secret-token' not in text
+        by_name = {span['name']: span for span in read_spans(path)}
+        assert by_name['send']['traceId'] == by_name['poll_cycle']['traceId']
@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import requests
+
+import homework
+from delivery import OutboundQueue
+from metrics import METRICS
+from tenants import Tenant, TenantState
+from validation import CredentialValidator
+
+
+class CountingProbe:
+
+    def __init__(self, invalid=(), failing=(), delay=0):
+        self.invalid = set(invalid)
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tenant):
+        with self._lock:
+            self.calls.append(tenant)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if tenant.chat_id in self.failing:
+            raise ConnectionError('нет связи')
+        if tenant.chat_id in self.invalid:
+            return False, 'недействительный токен Практикума'
+        return True, ''
+
+
+class TestCredentialValidator:
+
+    def test_bulk_validation_is_bounded_and_cached(self):
+        probe = CountingProbe(delay=0.01)
+        validator = CredentialValidator(probe, max_workers=4)
+        tenants = [Tenant(str(number), 'token') for number in range(20)]
+        assert validator.validate(tenants) == []
+        assert len(probe.calls) == 20
+        assert 1 < probe.max_active <= 4, (
+            'Проверки должны идти параллельно, но не более max_workers'
+        )
+        validator.validate(tenants)
+        assert len(probe.calls) == 20, (
+            'Свежие результаты должны браться из кэша'
+        )
+
+    def test_invalid_tenants_quarantined(self):
+        now = [0]
+        probe = CountingProbe(invalid={'2'}, failing={'3'})
+        validator = CredentialValidator(
+            probe, ttl=100, invalid_ttl=10, clock=lambda: now[0], jitter=0
+        )
+        tenants = [Tenant(chat_id, 'token') for chat_id in '123']
+        assert validator.validate(tenants) == [Tenant('2', 'token')]
+        assert validator.is_valid(Tenant('1', 'token')) is True
+        assert validator.is_valid(Tenant('2', 'token')) is False
+        assert validator.is_valid(Tenant('3', 'token')) is None, (
+            'Временный сбой проверки не должен отправлять на карантин'
+        )
+        assert validator.is_valid(Tenant('2', 'new_token')) is None, (
+            'Смена токена должна требовать новой проверки'
+        )
+        assert METRICS.get('tenants_quarantined') == 1
+
+        now[0] = 11
+        validator.validate(tenants)
+        assert [tenant.chat_id for tenant in probe.calls].count('2') == 2, (
+            'Подписчик на карантине должен перепроверяться после invalid_ttl'
+        )
+        assert [tenant.chat_id for tenant in probe.calls].count('1') == 1
+
+    def test_validation_spread_over_calls(self):
+        probe = CountingProbe()
+        validator = CredentialValidator(probe, batch_size=8)
+        tenants = [Tenant(str(number), 'token') for number in range(20)]
+        validator.validate(tenants)
+        assert len(probe.calls) == 8, (
+            'За один вызов должно проверяться не больше batch_size'
+        )
+        assert validator.pending == 12
+        validator.validate([])
+        validator.validate(tenants)
+        assert len(probe.calls) == 20
+        assert len(set(probe.calls)) == 20, (
+            'Подписчики из очереди не должны проверяться повторно'
+        )
+        assert validator.pending == 0
+
+    def test_ttl_jitter(self):
+        now = [0]
+        validator = CredentialValidator(
+            CountingProbe(), ttl=1000, clock=lambda: now[0], jitter=0.5
+        )
+        tenants = [Tenant(str(number), 'token') for number in range(50)]
+        validator.validate(tenants)
+        now[0] = 750
+        expired = [
+            tenant for tenant in tenants if validator.is_valid(tenant) is None
+        ]
+        assert 0 < len(expired) < len(tenants), (
+            'Результаты проверки не должны истекать одновременно'
+        )
+
+    def test_rejected_on_poll_quarantined(self, monkeypatch):
+        polled = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            polled.append(params)
+            return SimpleNamespace(status_code=401)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        monkeypatch.setattr(
+            homework, 'OUTBOX', OutboundQueue(homework.deliver)
+        )
+        tenant = Tenant('revoked', 'token')
+        probe = CountingProbe()
+        validator = CredentialValidator(probe)
+        validator.validate([tenant])
+        assert validator.is_valid(tenant) is True
+        state = TenantState(tenant, 0)
+        state.seeded = True
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            homework.poll_due(pool, validator, [state])
+            assert validator.is_valid(tenant) is False, (
+                'Отозванный токен должен отправлять подписчика на карантин'
+            )
+            polls = len(polled)
+            homework.poll_due(pool, validator, [state])
+        assert len(polled) == polls, (
+            'Подписчик на карантине не должен опрашиваться'
+        )
+        assert len(homework.OUTBOX) == 1
+        assert METRICS.get('tenants_quarantined') >= 1
@@ -1,3 +1,4 @@
+import json
 from inspect import signature
 from types import ModuleType
 
@@ -37,3 +38,22 @@ def check_default_var_exists(scope: ModuleType, var_name: str) -> None:
         f'{var_name} должна быть переменной, а не функцией.'
     )
 
+
+class FakeClock:
+    """Clock whose current time is set by hand through `now`."""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_record(at, homeworks, status_code=200):
+    """Recorded API response for replay.simulate at the moment `at`."""
+    return {
+        'at': at,
+        'params': {'from_date': at},
+        'status_code': status_code,
+        'text': json.dumps({'homeworks': homeworks, 'current_date': at}),
+    }
@@ -0,0 +1,188 @@
+import atexit
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Коды статуса и вида участка из протокола OTLP.
+STATUS_CODES = {'OK': 1, 'ERROR': 2}
+SPAN_KIND_INTERNAL = 1
+
+
+def otlp_value(value):
+    """Значение тега в виде AnyValue из OTLP/JSON."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_attributes(attributes):
+    """Теги в виде списка KeyValue из OTLP/JSON."""
+    return [
+        {'key': key, 'value': otlp_value(value)}
+        for key, value in attributes.items()
+    ]
+
+
+class Span:
+    """Участок трассы: имя, время начала и конца, теги и итог."""
+
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_id', 'name',
+        'start', 'end', 'attributes', 'status', 'message'
+    )
+
+    def __init__(self, trace_id, parent_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.status = 'OK'
+        self.message = ''
+
+    def set(self, **attributes):
+        """Добавляет теги к участку."""
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        """Участок в виде Span из OTLP/JSON."""
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': otlp_attributes(self.attributes),
+            'status': {
+                'code': STATUS_CODES[self.status], 'message': self.message
+            },
+        }
+
+
+class Tracer:
+    """Трассировка циклов опроса с выгрузкой в файл в формате OTLP/JSON.
+    В трассу попадает только доля sample_rate циклов, для остальных
+    trace() и span() ничего не делают. Завершённые участки копятся
+    в буфере и дописываются в файл пачками: каждая пачка — одна строка
+    с запросом ExportTraceServiceRequest, как у файлового экспортёра
+    OpenTelemetry Collector.
+    """
+
+    def __init__(self, path, sample_rate=0.1, batch_size=100,
+                 flush_interval=10, service_name='homework_bot'):
+        self.path = path
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def current(self):
+        """Активный участок текущего потока или None."""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def context(self):
+        """Ссылка на корень активной трассы для resume() или None."""
+        stack = getattr(self._local, 'stack', None)
+        if not stack:
+            return None
+        return stack[0].trace_id, stack[0].span_id
+
+    def tag(self, **attributes):
+        """Добавляет теги к активному участку, если он есть."""
+        span = self.current()
+        if span is not None:
+            span.set(**attributes)
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """Начинает новую трассу, если цикл попал в выборку."""
+        if random.random() >= self.sample_rate:
+            yield None
+            return
+        trace_id = f'{random.getrandbits(128):032x}'
+        with self._run(Span(trace_id, None, name, attributes)) as span:
+            yield span
+        self._maybe_flush()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Дочерний участок активной трассы."""
+        parent = self.current()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace_id, parent.span_id, name, attributes)
+        with self._run(span):
+            yield span
+
+    @contextmanager
+    def resume(self, context, name, **attributes):
+        """Участок трассы, начатой раньше или в другом потоке.
+        context берётся из context(); при None ничего не записывается.
+        """
+        if context is None:
+            yield None
+            return
+        trace_id, parent_id = context
+        with self._run(Span(trace_id, parent_id, name, attributes)) as span:
+            yield span
+        self._maybe_flush()
+
+    def flush(self):
+        """Дописывает накопленные участки в файл."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return
+        request = {'resourceSpans': [{
+            'resource': {'attributes': otlp_attributes(
+                {'service.name': self.service_name}
+            )},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [span.to_dict() for span in batch],
+            }],
+        }]}
+        with open(self.path, 'a', encoding='utf-8') as output:
+            output.write(json.dumps(request, ensure_ascii=False) + '\n')
+
+    @contextmanager
+    def _run(self, span):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(span)
+        try:
+            yield span
+        except Exception as error:
+            span.status = 'ERROR'
+            span.message = str(error)
+            raise
+        finally:
+            span.end = time.time_ns()
+            self._local.stack.pop()
+            with self._lock:
+                self._buffer.append(span)
+
+    def _maybe_flush(self):
+        if (
+            len(self._buffer) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
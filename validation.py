@@ -0,0 +1,122 @@
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+Validity = namedtuple('Validity', ['valid', 'reason', 'expires_at'])
+
+
+class CredentialValidator:
+    """Массовая проверка учётных данных подписчиков.
+    probe(tenant) возвращает пару (valid, reason) или выбрасывает
+    исключение, если проверить не удалось. Проверки выполняются
+    параллельно не более чем в max_workers потоков, результаты
+    кэшируются: действительные на ttl, недействительные на invalid_ttl
+    секунд. Ключ кэша — подписчик целиком, поэтому смена токена
+    сразу требует новой проверки. Срок жизни результата случайно
+    сокращается на долю до jitter, чтобы подписчики, проверенные
+    одновременно, не перепроверялись тоже все разом.
+    За один вызов validate() проверяется не больше batch_size
+    подписчиков, остальные ждут следующего вызова в очереди.
+    """
+
+    def __init__(self, probe, max_workers=8, ttl=24 * 60 * 60,
+                 invalid_ttl=60 * 60, clock=time.monotonic, batch_size=100,
+                 jitter=0.1):
+        self._probe = probe
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.invalid_ttl = invalid_ttl
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self._clock = clock
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Число подписчиков, ожидающих проверки."""
+        return len(self._pending)
+
+    def is_valid(self, tenant):
+        """True/False по свежему результату проверки, None если его нет."""
+        result = self._results.get(tenant)
+        if result is None or result.expires_at <= self._clock():
+            return None
+        return result.valid
+
+    def validate(self, tenants):
+        """Проверяет не больше batch_size подписчиков из очереди.
+        Подписчики без свежего результата сначала ставятся в очередь.
+        Возвращает список подписчиков, признанных недействительными.
+        """
+        for tenant in tenants:
+            if tenant not in self._pending and self.is_valid(tenant) is None:
+                self._pending[tenant] = None
+        stale = list(itertools.islice(self._pending, self.batch_size))
+        for tenant in stale:
+            del self._pending[tenant]
+        METRICS.set('tenants_validation_pending', len(self._pending))
+        if not stale:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._check, stale))
+        invalid = [
+            tenant for tenant, valid in zip(stale, results) if valid is False
+        ]
+        self._prune()
+        METRICS.inc('tenants_validated', len(stale))
+        METRICS.set('tenants_quarantined', self.quarantined())
+        return invalid
+
+    def invalidate(self, tenant, reason):
+        """Отправляет на карантин подписчика, отвергнутого вне проверки."""
+        self._pending.pop(tenant, None)
+        self._store(tenant, False, reason)
+        METRICS.set('tenants_quarantined', self.quarantined())
+
+    def quarantined(self):
+        """Число подписчиков со свежим отрицательным результатом."""
+        now = self._clock()
+        with self._lock:
+            return sum(
+                not result.valid and result.expires_at > now
+                for result in self._results.values()
+            )
+
+    def _prune(self):
+        now = self._clock()
+        with self._lock:
+            self._results = {
+                tenant: result for tenant, result in self._results.items()
+                if result.expires_at > now
+            }
+
+    def _check(self, tenant):
+        try:
+            valid, reason = self._probe(tenant)
+        except Exception as error:
+            logging.warning(
+                f'Не удалось проверить подписчика {tenant.chat_id}: {error}'
+            )
+            return None
+        self._store(tenant, valid, reason)
+        return valid
+
+    def _store(self, tenant, valid, reason):
+        ttl = self.ttl if valid else self.invalid_ttl
+        ttl *= 1 - random.uniform(0, self.jitter)
+        with self._lock:
+            self._results[tenant] = Validity(
+                valid, reason, self._clock() + ttl
+            )
+        if not valid:
+            logging.error(
+                f'Подписчик {tenant.chat_id} на карантине: {reason}'
+            )